@@ -0,0 +1,213 @@
+"""HTTP prediction API for the lake models.
+
+A plain ASGI application with no web framework dependency::
+
+    GET  /lakes                  every lake with its features and baseline
+    GET  /lakes/{name}           one lake
+    POST /lakes/{name}/predict   {"AVFST_Max": 90, ...} -> one prediction
+    POST /predict                {"scenarios": [{"lake": "Yale", ...}, ...]}
+
+Features a request leaves out keep the lake's 2022 baseline. The batch
+endpoint scores all scenarios with one vectorized pass. Run it under any ASGI
+server; with uvicorn, ``python api.py --workers 4`` starts one process per
+worker so throughput scales with cores.
+"""
+import argparse
+import asyncio
+import json
+import math
+
+import numpy as np
+
+import registry
+import scoring
+
+MAX_BODY = 64 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PredictionAPI:
+
+    def __init__(self, reg=None):
+        self.scorer = scoring.Scorer(reg if reg is not None else registry.load())
+        reg = self.scorer.registry
+        self.shared = {}   # title -> script names, for titles several lakes use
+        self.lookup = {}
+        shared = reg.shared_titles()
+        for k, i in enumerate(self.scorer.index):
+            if str(reg.titles[i]) in shared:
+                self.shared.setdefault(str(reg.titles[i]), []).append(str(reg.names[i]))
+            else:
+                self.lookup[str(reg.titles[i])] = k
+            self.lookup[str(reg.names[i])] = k
+        self.allowed = [{'lake', *reg.features(str(name))} for name in self.scorer.names]
+        self.lakes = [self._describe(str(name)) for name in self.scorer.names]
+
+    def _describe(self, name):
+        reg = self.scorer.registry
+        i = reg.index(name)
+        return {
+            'name': name,
+            'title': str(reg.titles[i]),
+            'features': list(reg.features(name)),
+            'baseline': reg.initial_values(name),
+            'slider_ranges': {f: [float(lo), float(hi)] for f, lo, hi in
+                              zip(reg.features(name), reg.slider_lo[i], reg.slider_hi[i])},
+        }
+
+    def _position(self, lake):
+        if str(lake) in self.shared:
+            raise HTTPError(400, f"{lake!r} is the title of several lakes; "
+                                 f"give the script name ({' or '.join(self.shared[str(lake)])})")
+        try:
+            return self.lookup[str(lake)]
+        except KeyError:
+            raise HTTPError(404, f"unknown lake {lake!r}") from None
+
+    @staticmethod
+    def _number(n, feature, value):
+        """``value`` as a finite float; JSON booleans, strings, lists and overflows are refused."""
+        if value is None:
+            return math.nan
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise HTTPError(400, f"scenario {n}: {feature} must be a number")
+        try:
+            value = float(value)
+        except OverflowError:
+            value = math.inf
+        if not math.isfinite(value):
+            raise HTTPError(400, f"scenario {n}: {feature} must be finite")
+        return value
+
+    def predict(self, scenarios):
+        """Score a list of ``{"lake": ..., feature: value}`` dicts in one pass."""
+        if not isinstance(scenarios, list):
+            raise HTTPError(400, "'scenarios' must be a list")
+        features = self.scorer.features
+        position = np.empty(len(scenarios), dtype=np.intp)
+        for n, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict) or 'lake' not in scenario:
+                raise HTTPError(400, f"scenario {n} has no 'lake'")
+            position[n] = self._position(scenario['lake'])
+            unknown = set(scenario) - self.allowed[position[n]]
+            if unknown:
+                raise HTTPError(400, f"scenario {n}: {', '.join(sorted(unknown))} not among the features "
+                                     f"of {self.scorer.names[position[n]]}")
+
+        # Start from each lake's baseline and overlay the given values column by column
+        values = self.scorer.baseline[position]
+        for j, feature in enumerate(features):
+            column = [scenario.get(feature) for scenario in scenarios]
+            if all(v is None for v in column):
+                continue
+            column = np.array([self._number(n, feature, v) for n, v in enumerate(column)], dtype=np.float64)
+            given = ~np.isnan(column)
+            values[given, j] = column[given]
+        magnitude = self.scorer.score_rows(position, values)
+        norm_cyan = self.scorer.norm_cyan[position]
+        change = (magnitude - norm_cyan) / norm_cyan * 100
+        if not (np.isfinite(magnitude).all() and np.isfinite(change).all()):
+            n = int(np.flatnonzero(~(np.isfinite(magnitude) & np.isfinite(change)))[0])
+            raise HTTPError(400, f"scenario {n}: the prediction overflows; check the input values")
+        return [
+            {'lake': str(self.scorer.names[k]), 'predicted_magnitude': m, 'percentage_change': c}
+            for k, m, c in zip(position.tolist(), magnitude.tolist(), change.tolist())
+        ]
+
+    def route(self, method, path, body):
+        parts = [p for p in path.split('/') if p]
+        if parts == ['lakes'] and method == 'GET':
+            return self.lakes
+        if len(parts) == 2 and parts[0] == 'lakes' and method == 'GET':
+            return self.lakes[self._position(parts[1])]
+        if len(parts) == 3 and parts[0] == 'lakes' and parts[2] == 'predict' and method == 'POST':
+            if body is not None and not isinstance(body, dict):
+                raise HTTPError(400, "expected a JSON object of feature values")
+            features = body or {}
+            return self.predict([dict(features, lake=parts[1])])[0]
+        if parts == ['predict'] and method == 'POST':
+            if not isinstance(body, dict):
+                raise HTTPError(400, "expected a JSON object with 'scenarios'")
+            return {'predictions': self.predict(body.get('scenarios'))}
+        if parts in (['lakes'], ['predict']) or (parts and parts[0] == 'lakes'):
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        raise HTTPError(404, f"no route for {path}")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        try:
+            body = await self._read_body(receive)
+            if scope['method'] == 'POST':
+                # Large batches are scored off the event loop so other requests keep flowing
+                result = await asyncio.to_thread(self.route, scope['method'], scope['path'], body)
+            else:
+                result = self.route(scope['method'], scope['path'], body)
+            status = 200
+        except HTTPError as exc:
+            result, status = {'error': exc.message}, exc.status
+        payload = json.dumps(result).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(payload)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY:
+                raise HTTPError(413, "request body too large")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        raw = b''.join(chunks)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON") from None
+
+
+app = PredictionAPI()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the lake models over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="worker processes")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("serving needs an ASGI server: pip install uvicorn") from None
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import streamlit as st
+
+import client
+import history
+import huc
+import lake_page
+import registry
+
+# One server for every lake: the lake is picked with ?lake=<script name>
+# and only that lake's widgets are built on each run. With ?mode=browser the
+# sliders and the model run client-side, so dragging them costs no reruns.
+DEFAULT_LAKE = 'Apopka'
+BROWSER_MODE = 'browser'
+
+
+@st.cache_resource
+def load_registry():
+    return registry.load()
+
+
+@st.cache_resource
+def load_hucs():
+    return huc.load(load_registry())
+
+
+@st.cache_resource
+def load_history():
+    return history.load()
+
+
+@st.cache_data
+def browser_page(lake, version):
+    return client.component_html(load_registry(), lake)
+
+
+reg = load_registry()
+names = [str(name) for name in reg.names]
+titles = reg.display_titles()
+
+lake = st.query_params.get('lake', DEFAULT_LAKE)
+if lake not in reg:
+    st.error(f"Unknown lake **{lake}**; showing {titles[DEFAULT_LAKE]} instead.")
+    lake = DEFAULT_LAKE
+
+
+def choose_lake():
+    st.query_params['lake'] = st.session_state.lake
+
+
+def choose_mode():
+    if st.session_state.browser_mode:
+        st.query_params['mode'] = BROWSER_MODE
+    else:
+        st.query_params.pop('mode', None)
+
+
+st.sidebar.selectbox("**🏞️ Lake**", names, index=names.index(lake), format_func=titles.get,
+                     key="lake", on_change=choose_lake)
+browser_mode = st.sidebar.toggle("**⚡ Compute in the browser**",
+                                 value=st.query_params.get('mode') == BROWSER_MODE,
+                                 key="browser_mode", on_change=choose_mode,
+                                 help="Send the model to the browser once and recompute there as the sliders move.")
+
+if browser_mode:
+    st.iframe(browser_page(lake, reg.version), height=900)
+else:
+    lake_page.render(reg, lake, load_hucs(), load_history())
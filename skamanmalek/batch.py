@@ -0,0 +1,157 @@
+"""Score scenario files through the lake models without Streamlit.
+
+Each input row names a ``lake`` (the script name, e.g. ``Yale``, or its title,
+e.g. ``Lake Yale``) and any of the slider features::
+
+    lake,AVFST_Max,ARAIN_Average,HUC12_forest_and_shrubland_4,...
+
+Features left out or blank keep the lake's 2022 baseline, just like an
+untouched slider. The input is read and written chunk by chunk, so memory
+stays bounded however large the file is. Usage::
+
+    python batch.py scenarios.csv predictions.csv [--chunksize 100000]
+    python batch.py scenarios.parquet predictions.parquet
+
+The output repeats the input columns and adds ``predicted_magnitude`` and
+``percentage_change``. Unknown lakes get blank predictions and are listed on
+stderr; so do titles shared by several lakes ("Lake Loughman" is both
+Loughman.py and lakeLoughman.py), which need the script name instead.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import registry
+import scoring
+
+LAKE_COLUMN = 'lake'
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet files need pyarrow: pip install pyarrow") from None
+    return pa, pq
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames of at most ``chunksize`` rows."""
+    if _is_parquet(path):
+        _, pq = _import_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class _Writer:
+    """Appends DataFrames to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._started = False
+
+    def write(self, frame):
+        if self.parquet:
+            pa, pq = _import_pyarrow()
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._started else 'w',
+                         header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_frame(scorer, lookup, frame):
+    """Add prediction columns to one chunk; return it with the unknown lake names."""
+    if LAKE_COLUMN not in frame:
+        raise SystemExit(f"input has no {LAKE_COLUMN!r} column")
+    lakes = frame[LAKE_COLUMN].astype(str)
+    position = lakes.map(lookup).fillna(-1).to_numpy(dtype=np.intp)
+
+    # Start every row at its lake's baseline, then overlay the supplied values
+    take = np.where(position >= 0, position, 0)
+    scenarios = scorer.baseline[take]
+    frame = frame.copy()
+    for j, feature in enumerate(scorer.features):
+        if feature in frame:
+            values = pd.to_numeric(frame[feature], errors='coerce').to_numpy(dtype=np.float64)
+            # Always float, so chunks agree on the column type whatever pandas inferred
+            frame[feature] = values
+            given = ~np.isnan(values)
+            scenarios[given, j] = values[given]
+
+    magnitude = scorer.score_rows(position, scenarios)
+    norm_cyan = np.where(position >= 0, scorer.norm_cyan[take], np.nan)
+    frame['predicted_magnitude'] = magnitude
+    frame['percentage_change'] = (magnitude - norm_cyan) / norm_cyan * 100
+    return frame, set(lakes[position < 0])
+
+
+def run(source, destination, chunksize=100_000, reg=None):
+    scorer = scoring.Scorer(reg)
+    shared = scorer.registry.shared_titles()
+    lookup = {}
+    for k, i in enumerate(scorer.index):
+        if str(scorer.registry.titles[i]) not in shared:
+            lookup[str(scorer.registry.titles[i])] = k
+        lookup[str(scorer.registry.names[i])] = k
+
+    writer = _Writer(destination)
+    unknown = set()
+    rows = 0
+    try:
+        for chunk in read_chunks(source, chunksize):
+            scored, missing = score_frame(scorer, lookup, chunk)
+            writer.write(scored)
+            unknown |= missing
+            rows += len(scored)
+    except BaseException:
+        writer.close()
+        if os.path.exists(destination):
+            os.remove(destination)   # no half-written output
+        raise
+    writer.close()
+    return rows, unknown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score scenario rows through the lake models")
+    parser.add_argument('input', help="scenario CSV or Parquet file")
+    parser.add_argument('output', help="where to write predictions (.csv or .parquet)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="rows per chunk")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    reg = registry.load(args.registry)
+    rows, unknown = run(args.input, args.output, args.chunksize, reg)
+    print(f"scored {rows} rows into {args.output}")
+    shared = unknown & reg.shared_titles()
+    if shared:
+        print(f"titles shared by several lakes, give the script name instead: {', '.join(sorted(shared))}",
+              file=sys.stderr)
+    if unknown - shared:
+        print(f"unknown lakes: {', '.join(sorted(unknown - shared))}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Per-rerun latency benchmark for the lake apps.
+
+Drives each lake script headlessly with Streamlit's ``AppTest``: after the
+first run it moves one slider per rerun to a new value and records
+
+* wall time of every rerun,
+* bytes of the delta messages the rerun sends and how many there are,
+* peak Python memory of a rerun (``tracemalloc``, measured in a separate pass
+  so it does not slow the timed reruns),
+* time spent in the usual suspects: ``pandas.DataFrame`` construction,
+  building the chart from a DataFrame (``st.bar_chart``), converting it to a
+  Vega-Lite spec, marshalling chart data and creating sliders.
+
+One JSON report per lake is written to the output directory, as
+``<lake>.script.json``. ``--app`` drives app.py (``?lake=<name>``) instead of
+the individual scripts and writes ``<lake>.app.json``, so the two runs sit
+side by side for comparison.
+Usage::
+
+    python benchmark.py [--reruns 20] [--output benchmarks/] [--app] [Yale Apopka ...]
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import compile_registry
+
+APP = os.path.join(compile_registry.HERE, 'app.py')
+
+
+class _Probe:
+    """Accumulates time spent in patched functions and bytes of sent deltas."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.delta_bytes = 0
+        self.deltas = 0
+
+    def reset(self):
+        self.seconds = {}
+        self.delta_bytes = 0
+        self.deltas = 0
+
+    @contextlib.contextmanager
+    def timing(self, owner, attr, label):
+        original = owner.__dict__.get(attr)
+        wrapped = getattr(owner, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return wrapped(*args, **kwargs)
+            finally:
+                self.seconds[label] = self.seconds.get(label, 0.0) + time.perf_counter() - start
+
+        setattr(owner, attr, timed)
+        try:
+            yield
+        finally:
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+
+    @contextlib.contextmanager
+    def messages(self):
+        from streamlit.testing.v1 import local_script_runner
+        parse = local_script_runner.parse_tree_from_messages
+
+        def counted(messages):
+            for message in messages:
+                if message.WhichOneof('type') == 'delta':
+                    self.deltas += 1
+                    self.delta_bytes += message.ByteSize()
+            return parse(messages)
+
+        local_script_runner.parse_tree_from_messages = counted
+        try:
+            yield
+        finally:
+            local_script_runner.parse_tree_from_messages = parse
+
+
+@contextlib.contextmanager
+def _instrumented(probe):
+    import pandas as pd
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.elements import vega_charts
+
+    # st.bar_chart & co. are bound at import time, so time the helpers they
+    # call rather than the element methods themselves
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(probe.messages())
+        stack.enter_context(probe.timing(pd.DataFrame, '__init__', 'dataframe'))
+        stack.enter_context(probe.timing(vega_charts, 'generate_chart', 'chart_build'))
+        stack.enter_context(probe.timing(vega_charts, '_convert_altair_to_vega_lite_spec', 'chart_to_spec'))
+        stack.enter_context(probe.timing(vega_charts, '_marshall_chart_data', 'chart_marshal'))
+        stack.enter_context(probe.timing(DeltaGenerator, 'slider', 'slider'))
+        yield
+
+
+def _new_app(lake, path, use_app):
+    from streamlit.testing.v1 import AppTest
+    if use_app:
+        at = AppTest.from_file(APP, default_timeout=30)
+        at.query_params['lake'] = lake
+        return at
+    return AppTest.from_file(path, default_timeout=30)
+
+
+def _moves(at, reruns, rng):
+    """(slider index, new value) for each rerun, cycling through the sliders."""
+    sliders = at.sidebar.slider
+    moves = []
+    for n in range(reruns):
+        k = n % len(sliders)
+        lo, hi = sliders[k].min, sliders[k].max
+        moves.append((k, round(float(rng.uniform(lo, hi)), 1)))
+    return moves
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        'mean': statistics.fmean(values),
+        'median': statistics.median(values),
+        'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        'max': values[-1],
+    }
+
+
+def bench(lake, path, reruns=20, seed=0, use_app=False):
+    """Benchmark one lake; returns its report dict."""
+    report = {'lake': lake, 'script': os.path.basename(APP if use_app else path), 'reruns': reruns}
+    probe = _Probe()
+    with _instrumented(probe):
+        at = _new_app(lake, path, use_app)
+        start = time.perf_counter()
+        at.run()
+        report['first_run_ms'] = (time.perf_counter() - start) * 1000
+        if at.exception:
+            report['error'] = at.exception[0].message
+            return report
+        if not at.sidebar.slider:
+            report['error'] = "the script did not render any sliders (does it compile?)"
+            return report
+        report['first_run_bytes'] = probe.delta_bytes
+
+        moves = _moves(at, reruns, np.random.default_rng(seed))
+        elapsed, sent, counts, hotspots = [], [], [], {}
+        for k, value in moves:
+            probe.reset()
+            at.sidebar.slider[k].set_value(value)
+            start = time.perf_counter()
+            at.run()
+            elapsed.append((time.perf_counter() - start) * 1000)
+            sent.append(probe.delta_bytes)
+            counts.append(probe.deltas)
+            for label, seconds in probe.seconds.items():
+                hotspots.setdefault(label, []).append(seconds * 1000)
+
+        # Memory pass: same moves on a fresh app, traced
+        at = _new_app(lake, path, use_app)
+        at.run()
+        peaks = []
+        for k, value in moves:
+            at.sidebar.slider[k].set_value(value)
+            tracemalloc.start()
+            at.run()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    report['rerun_ms'] = _summary(elapsed)
+    report['bytes_per_rerun'] = statistics.fmean(sent)
+    report['deltas_per_rerun'] = statistics.fmean(counts)
+    report['bytes_per_delta'] = sum(sent) / max(sum(counts), 1)
+    report['peak_memory_bytes'] = max(peaks)
+    report['hotspots_ms_per_rerun'] = {label: sum(ms) / reruns for label, ms in sorted(hotspots.items())}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lake app reruns with AppTest")
+    parser.add_argument('lakes', nargs='*', help="lake script names (default: every lake script)")
+    parser.add_argument('--reruns', type=int, default=20, help="slider moves per lake")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmarks', help="directory for the JSON reports")
+    parser.add_argument('--app', action='store_true', help="drive app.py instead of the lake scripts")
+    args = parser.parse_args(argv)
+
+    scripts = {os.path.splitext(os.path.basename(p))[0]: p for p in compile_registry.lake_scripts()}
+    lakes = args.lakes or list(scripts)
+    os.makedirs(args.output, exist_ok=True)
+    mode = 'app' if args.app else 'script'
+    for lake in lakes:
+        if lake not in scripts:
+            print(f"{lake}: no such lake script", file=sys.stderr)
+            continue
+        report = bench(lake, scripts[lake], args.reruns, args.seed, args.app)
+        with open(os.path.join(args.output, f"{lake}.{mode}.json"), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        if 'error' in report:
+            print(f"{lake}: failed: {report['error']}", file=sys.stderr)
+        else:
+            print(f"{lake}: {report['rerun_ms']['median']:.1f} ms/rerun, "
+                  f"{report['bytes_per_rerun']:.0f} B/rerun, "
+                  f"peak {report['peak_memory_bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Bootstrap confidence intervals for every lake model.
+
+Each replicate resamples every lake's training rows with replacement (a
+multinomial weight per row within the lake) and refits all lakes at once:
+the weighted normal equations of a chunk of replicates come out of one
+segmented sum (:func:`fit.normal_equations`) and go to one batched solve.
+Chunks run in a process pool, each with its own RNG stream spawned from one
+seed, so the result depends on ``--seed`` only, not on the number of workers.
+
+The registry gets, per lake, the point fit the intervals belong to
+(``intercept``/``coef`` and the fit statistics, as fit.py writes them) and:
+
+* ``coef_cov``: the bootstrap covariance of ``(intercept, *coef)``;
+* ``residual_var``: the residual variance of the lake's fit;
+* ``prediction_interval``: the bootstrap prediction interval of the bloom
+  magnitude at the 2022 baseline inputs (a refit plus a resampled residual
+  per replicate), at ``interval_level``.
+
+With ``coef_cov`` and ``residual_var`` stored, :func:`interval` gives the
+lake page an interval for any slider values with a 7x7 quadratic form.
+Lakes with fewer rows than parameters get NaN. Usage::
+
+    python bootstrap.py observations.csv [--replicates 1000] [--level 0.95] [--seed 0] [--jobs 4]
+"""
+import argparse
+import csv
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fit
+import registry
+
+REPLICATES = 1000
+CHUNK = 16   # replicates per task; the weighted terms take CHUNK x rows x 58 floats
+LEVEL = 0.95
+
+
+def _resample(task):
+    """Coefficients and baseline predictions of ``size`` replicates."""
+    X, y, residual, starts, counts, owner, x0, ridge, seed, size = task
+    rng = np.random.default_rng(seed)
+    rows, lakes = len(y), len(starts)
+
+    # Multinomial row weights within each lake: every row draws a row of its own lake
+    draws = starts[owner] + (rng.random((size, rows)) * counts[owner]).astype(np.intp)
+    weights = np.zeros((size, rows))
+    np.add.at(weights, (np.arange(size)[:, None], draws), 1.0)
+    gram, moment, _, _ = fit.normal_equations(owner, X, y, lakes, weights)
+    beta = fit.solve(gram, moment, ridge)
+
+    noise = residual[starts + (rng.random((size, lakes)) * counts).astype(np.intp)]
+    prediction = np.einsum('lp,blp->bl', x0, beta) + noise
+    return beta, prediction
+
+
+def run(reg, table, replicates=REPLICATES, level=LEVEL, seed=0, ridge=0.0, min_rows=fit.PARAMETERS,
+        chunk=CHUNK, jobs=None):
+    """Bootstrap every lake in ``table``; returns ``(new_registry, fitted_lake_names)``."""
+    index, X, y, _, _ = fit.design(reg, table)
+    gram, moment, yy, nobs = fit.normal_equations(index, X, y, len(reg))
+    fitted = np.flatnonzero(nobs >= min_rows)
+    keep = np.isin(index, fitted)
+    owner = np.searchsorted(fitted, index[keep])
+    X, y = X[keep], y[keep]
+    _, starts, counts = np.unique(owner, return_index=True, return_counts=True)
+
+    beta = fit.solve(gram[fitted], moment[fitted], ridge)
+    residual = y - np.einsum('rp,rp->r', X, beta[owner])
+    rss = np.add.reduceat(residual ** 2, starts) if len(y) else np.empty(0)
+    dof = np.maximum(counts - fit.PARAMETERS, 1)
+
+    span = reg.norm_hi[fitted] - reg.norm_lo[fitted]
+    normalized = (reg.baseline[fitted] - reg.norm_lo[fitted]) / np.where(span != 0, span, 1.0)
+    x0 = np.column_stack([np.ones(len(fitted)), normalized])
+
+    streams = np.random.SeedSequence(seed).spawn(-(-replicates // chunk))
+    tasks = [(X, y, residual, starts, counts, owner, x0, ridge, stream, min(chunk, replicates - k * chunk))
+             for k, stream in enumerate(streams)]
+    if len(tasks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_resample, tasks))
+    else:
+        parts = [_resample(task) for task in tasks]
+    betas = np.concatenate([part[0] for part in parts])
+    predictions = np.concatenate([part[1] for part in parts])
+
+    lakes, p = len(reg), fit.PARAMETERS
+    coef_cov = np.full((lakes, p, p), np.nan)
+    centered = betas - betas.mean(axis=0)
+    coef_cov[fitted] = np.einsum('blp,blq->lpq', centered, centered) / max(replicates - 1, 1)
+    residual_var = np.full(lakes, np.nan)
+    residual_var[fitted] = rss / dof
+    tail = (1 - level) / 2
+    prediction_interval = np.full((lakes, 2), np.nan)
+    prediction_interval[fitted] = np.quantile(predictions, [tail, 1 - tail], axis=0).T * reg.scale[fitted, None]
+
+    # The intervals are centred on this table's fit, so it replaces the coefficients
+    intercept, coef = reg.intercept.copy(), reg.coef.copy()
+    intercept[fitted], coef[fitted] = beta[:, 0], beta[:, 1:]
+    stats = {'gram': gram, 'moment': moment, 'yy': yy, 'nobs': nobs}
+    if 'inverse_gram' in reg.arrays:
+        stats['inverse_gram'] = reg.inverse_gram.copy()
+        stats['inverse_gram'][fitted] = np.nan   # online.py derives it again from gram
+    return reg.replace(intercept=intercept, coef=coef, coef_cov=coef_cov, residual_var=residual_var,
+                       prediction_interval=prediction_interval, interval_level=np.float64(level),
+                       **stats), [str(n) for n in reg.names[fitted]]
+
+
+def interval(reg, lake, values, level=None):
+    """``(low, high)`` bloom magnitude for ``values`` from the stored bootstrap, or None.
+
+    A normal interval around the lake's prediction whose variance is the
+    coefficient part ``x0ᵀ coef_cov x0`` plus the residual variance.
+    """
+    if 'coef_cov' not in reg.arrays:
+        return None
+    i = reg.index(lake)
+    if not np.isfinite(reg.residual_var[i]):
+        return None
+    level = float(reg.interval_level) if level is None else level
+    span = reg.norm_hi[i] - reg.norm_lo[i]
+    x0 = np.concatenate(([1.0], (np.asarray(values, dtype=np.float64) - reg.norm_lo[i]) / span))
+    center = x0 @ np.concatenate(([reg.intercept[i]], reg.coef[i]))
+    sd = np.sqrt(x0 @ reg.coef_cov[i] @ x0 + reg.residual_var[i])
+    z = statistics.NormalDist().inv_cdf(0.5 + level / 2)
+    return float((center - z * sd) * reg.scale[i]), float((center + z * sd) * reg.scale[i])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for every lake model")
+    parser.add_argument('observations', help="CSV or Parquet table: lake, year, Norm_CyAN and the features")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="registry to start from")
+    parser.add_argument('--output', default=registry.DEFAULT_PATH)
+    parser.add_argument('--replicates', type=int, default=REPLICATES)
+    parser.add_argument('--level', type=float, default=LEVEL, help="prediction interval coverage")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ridge', type=float, default=0.0, help="ridge penalty on the normal equations")
+    parser.add_argument('--min-rows', type=int, default=fit.PARAMETERS,
+                        help="lakes with fewer rows get no intervals")
+    parser.add_argument('--chunk', type=int, default=CHUNK, help="replicates per worker task")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--csv', help="also write lake,low,high baseline intervals here")
+    args = parser.parse_args(argv)
+    if not 0 < args.level < 1:
+        raise SystemExit("--level must be between 0 and 1")
+
+    reg = registry.load(args.registry)
+    new, fitted = run(reg, fit.read_table(args.observations), args.replicates, args.level, args.seed,
+                      args.ridge, args.min_rows, args.chunk, args.jobs)
+    skipped = len(reg) - len(fitted)
+    if skipped:
+        print(f"{skipped} lakes had fewer than {args.min_rows} usable rows and got no intervals",
+              file=sys.stderr)
+    new.save(args.output)
+    print(f"bootstrapped {len(fitted)} lakes ({args.replicates} replicates) into {args.output} "
+          f"(version {new.version})")
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['lake', 'low', 'high'])
+            for name, (low, high) in zip(new.names, new.prediction_interval):
+                writer.writerow([name, low, high])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Lake estimators that run in the browser.
+
+The lake model is a six-term linear formula, so instead of rerunning the
+script on every slider tick the page can ship the lake's coefficients and
+``b1..g2`` bounds once and let ``static/cyan.js`` recompute the magnitude,
+percentage change and bar chart locally. The HTML built here is embedded with
+``st.iframe``; it does not change while the user drags sliders, so the server
+does no work until another lake is picked.
+"""
+import json
+import os
+
+from schema import FEATURE_WIDGETS
+
+STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+def lake_payload(reg, lake):
+    """Everything cyan.js needs to evaluate one lake, as JSON-ready data."""
+    i = reg.index(lake)
+    features = []
+    for j, feature in enumerate(reg.features(lake)):
+        label, _, help_text = FEATURE_WIDGETS[feature]
+        features.append({
+            'name': feature,
+            'label': label.strip('*'),
+            'help': help_text,
+            'lo': float(reg.slider_lo[i, j]),
+            'hi': float(reg.slider_hi[i, j]),
+            'value': float(reg.baseline[i, j]),
+            'coef': float(reg.coef[i, j]),
+            'normLo': float(reg.norm_lo[i, j]),
+            'normHi': float(reg.norm_hi[i, j]),
+        })
+    return {
+        'name': lake,
+        'title': str(reg.titles[i]),
+        'normCyan': float(reg.norm_cyan[i]),
+        'intercept': float(reg.intercept[i]),
+        'scale': float(reg.scale[i]),
+        'features': features,
+    }
+
+
+def read_static(name):
+    with open(os.path.join(STATIC, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def component_html(reg, lake):
+    """Self-contained HTML page evaluating ``lake`` in the browser."""
+    payload = json.dumps(lake_payload(reg, lake)).replace('</', '<\\/')
+    return (
+        "<style>" + read_static('cyan.css') + "</style>"
+        "<div id='cyan-root'></div>"
+        "<script>" + read_static('cyan.js') + "</script>"
+        "<script>CyAN.mount(document.getElementById('cyan-root'), " + payload + ");</script>"
+    )
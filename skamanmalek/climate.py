@@ -0,0 +1,245 @@
+"""Annual climate covariates per lake from gridded daily data.
+
+Builds the ``AVFST_Max`` and ``ARAIN_Average`` inputs for every lake from one
+gridded daily file per year: a NetCDF file or Zarr store (through xarray,
+optional) or a plain NumPy store, a directory with ``time.npy`` (datetime64
+days) and one memory-mapped ``(time, y, x)`` array per variable. Each year is
+read in chunks of days; every chunk is reduced to per-lake daily footprint
+means with one ``bincount`` over (day, lake) and folded into
+
+* ``AVFST_Max``: the year's highest daily footprint-mean maximum surface
+  temperature, in °F;
+* ``ARAIN_Average``: the mean monthly precipitation total over the footprint,
+  in kg/m² (``--rain-statistic daily`` or ``annual`` for other aggregations).
+
+Years run in parallel in a process pool and each reduced year is cached,
+keyed by the size and mtime of its input and of the footprints, so adding a
+year only reads the new file. Usage::
+
+    python climate.py climate/ --labels footprints.npy --zones zones.csv \\
+        [--temperature-units K] [--output climate.csv] [--update-registry --year 2022]
+
+``climate/`` holds one entry per year with the year in its name
+(``2022.nc``, ``gridmet_2022.zarr``, ``2022/``); ``--labels`` is the lake
+footprint label raster on the climate grid.
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import registry
+import zonal
+
+YEAR = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+RAIN_STATISTICS = ('monthly', 'daily', 'annual')
+READ_OPTIONS = ('chunk',)   # how the inputs are read, not what comes out
+CACHE_FORMAT = 1
+
+
+def _import_xarray():
+    try:
+        import xarray
+    except ImportError:
+        raise SystemExit("NetCDF/Zarr inputs need xarray: pip install xarray") from None
+    return xarray
+
+
+def year_inputs(folder):
+    """``{year: path}`` for the yearly inputs in ``folder``."""
+    inputs = {}
+    for name in sorted(os.listdir(folder)):
+        match = YEAR.search(name)
+        if match:
+            inputs[int(match.group(1))] = os.path.join(folder, name)
+    return inputs
+
+
+def open_year(path, variables):
+    """``(days, {variable: lazily sliceable (time, y, x) array})`` for one input."""
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'time.npy')):
+        days = np.load(os.path.join(path, 'time.npy')).astype('datetime64[D]')
+        return days, {v: np.load(os.path.join(path, f'{v}.npy'), mmap_mode='r') for v in variables}
+    xarray = _import_xarray()
+    dataset = xarray.open_zarr(path) if path.rstrip('/').endswith('.zarr') else xarray.open_dataset(path)
+    return dataset['time'].values.astype('datetime64[D]'), {v: dataset[v] for v in variables}
+
+
+def to_fahrenheit(values, units):
+    if units == 'K':
+        return (values - 273.15) * 9 / 5 + 32
+    if units == 'C':
+        return values * 9 / 5 + 32
+    return values
+
+
+def daily_zone_means(labels, block, zones):
+    """``(days, zones + 1)`` footprint means of a ``(days, y, x)`` block (NaN if no data)."""
+    # Labels past ``zones`` are skipped, as in zonal.zone_sums; they would spill into the next day
+    keep = (labels > 0) & (labels <= zones) & np.isfinite(block)
+    day = np.broadcast_to(np.arange(len(block))[:, None, None], block.shape)[keep]
+    flat = day * (zones + 1) + np.broadcast_to(labels, block.shape)[keep]
+    size = len(block) * (zones + 1)
+    count = np.bincount(flat, minlength=size).reshape(len(block), zones + 1)
+    total = np.bincount(flat, weights=block[keep], minlength=size).reshape(len(block), zones + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def reduce_year(task):
+    """Reduce one yearly input to per-zone temperature and rain statistics."""
+    path, labels_path, zones, options = task
+    days, arrays = open_year(path, (options['tmax'], options['precip']))
+    labels = np.asarray(zonal.read_labels(labels_path, tuple(arrays[options['tmax']].shape[1:]))).astype(np.intp)
+    tmax = np.full(zones + 1, -np.inf)
+    monthly = np.zeros((12, zones + 1))
+    rain_days = np.zeros((12, zones + 1), dtype=np.int64)
+    for start in range(0, len(days), options['chunk']):
+        stop = min(start + options['chunk'], len(days))
+        temperature = np.asarray(arrays[options['tmax']][start:stop], dtype=np.float64)
+        daily_t = to_fahrenheit(daily_zone_means(labels, temperature, zones), options['units'])
+        tmax = np.maximum(tmax, np.where(np.isnan(daily_t), -np.inf, daily_t).max(axis=0))
+        rain = np.asarray(arrays[options['precip']][start:stop], dtype=np.float64) * options['precip_scale']
+        daily_r = daily_zone_means(labels, rain, zones)
+        month = days[start:stop].astype('datetime64[M]').astype(np.int64) % 12
+        seen = ~np.isnan(daily_r)
+        np.add.at(monthly, month, np.where(seen, daily_r, 0.0))
+        np.add.at(rain_days, month, seen)
+    return {'tmax': tmax, 'monthly': monthly, 'rain_days': rain_days}
+
+
+def rain_statistic(reduced, statistic):
+    monthly, rain_days = reduced['monthly'], reduced['rain_days']
+    total_days = rain_days.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if statistic == 'daily':
+            return np.where(total_days > 0, monthly.sum(axis=0) / total_days, np.nan)
+        if statistic == 'annual':
+            return np.where(total_days > 0, monthly.sum(axis=0), np.nan)
+        months = (rain_days > 0).sum(axis=0)
+        return np.where(months > 0, monthly.sum(axis=0) / months, np.nan)
+
+
+class YearCache:
+    """Reduced years on disk, reused while the inputs' sizes and mtimes and the zone count match."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _file(self, year):
+        return os.path.join(self.folder, f"{year}.npz")
+
+    @staticmethod
+    def _stamp(paths, zones, options):
+        files = []
+        for path in paths:
+            files.extend([path] if os.path.isfile(path) else sorted(
+                os.path.join(root, name) for root, _, names in os.walk(path) for name in names))
+        stats = [(os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in files]
+        # Only options that change the reduced values invalidate a year
+        kept = sorted((key, value) for key, value in options.items() if key not in READ_OPTIONS)
+        return repr((CACHE_FORMAT, stats, zones, kept))
+
+    def get(self, year, paths, zones, options):
+        if not self.folder or not os.path.exists(self._file(year)):
+            return None
+        with np.load(self._file(year), allow_pickle=False) as data:
+            if str(data['stamp']) != self._stamp(paths, zones, options):
+                return None
+            return {key: data[key] for key in ('tmax', 'monthly', 'rain_days')}
+
+    def put(self, year, paths, zones, options, reduced):
+        if self.folder:
+            os.makedirs(self.folder, exist_ok=True)
+            np.savez(self._file(year), stamp=self._stamp(paths, zones, options), **reduced)
+
+
+def reduce_years(inputs, labels_path, zones, options, cache=None, jobs=None):
+    """``{year: reduced}`` for ``{year: path}``, reading only uncached years."""
+    cache = cache or YearCache(None)
+    results = {year: cache.get(year, (path, labels_path), zones, options) for year, path in inputs.items()}
+    stale = [year for year, reduced in results.items() if reduced is None]
+    tasks = [(inputs[year], labels_path, zones, options) for year in stale]
+    if len(tasks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            fresh = list(pool.map(reduce_year, tasks))
+    else:
+        fresh = [reduce_year(task) for task in tasks]
+    for year, reduced in zip(stale, fresh):
+        cache.put(year, (inputs[year], labels_path), zones, options, reduced)
+        results[year] = reduced
+    return results, stale
+
+
+def update_registry(reg, values):
+    """A new registry version with ``{lake: (AVFST_Max, ARAIN_Average)}`` in the baselines."""
+    baseline = reg.baseline.copy()
+    for lake, pair in values.items():
+        if lake not in reg:
+            continue
+        i = reg.index(lake)
+        for feature, value in zip(('AVFST_Max', 'ARAIN_Average'), pair):
+            if np.isfinite(value):
+                baseline[i, reg.features(lake).index(feature)] = value
+    return reg.replace(baseline=baseline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annual AVFST_Max and ARAIN_Average per lake")
+    parser.add_argument('inputs', help="directory with one gridded daily input per year")
+    parser.add_argument('--labels', required=True, help="lake footprint label raster on the climate grid")
+    parser.add_argument('--zones', required=True, help="zone,lake CSV naming the label values")
+    parser.add_argument('--tmax-variable', default='tmax')
+    parser.add_argument('--precip-variable', default='precip')
+    parser.add_argument('--temperature-units', choices=('K', 'C', 'F'), default='K')
+    parser.add_argument('--precip-scale', type=float, default=1.0,
+                        help="factor turning the precipitation values into daily kg/m² (86400 for kg/m²/s)")
+    parser.add_argument('--rain-statistic', choices=RAIN_STATISTICS, default='monthly')
+    parser.add_argument('--chunk', type=int, default=32, help="days read per chunk")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--cache', default='.climate_cache', help="reduced-year cache directory ('' disables)")
+    parser.add_argument('--output', default='climate.csv')
+    parser.add_argument('--update-registry', action='store_true',
+                        help="write the --year values into the registry baselines")
+    parser.add_argument('--year', type=int, help="year written by --update-registry (default: latest)")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    zones = zonal.read_zones(args.zones)
+    inputs = year_inputs(args.inputs)
+    if not inputs:
+        raise SystemExit(f"no yearly inputs in {args.inputs}")
+    options = {'tmax': args.tmax_variable, 'precip': args.precip_variable, 'units': args.temperature_units,
+               'precip_scale': args.precip_scale, 'chunk': args.chunk}
+    results, read = reduce_years(inputs, args.labels, max(zones), options, YearCache(args.cache or None), args.jobs)
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['lake', 'year', 'AVFST_Max', 'ARAIN_Average'])
+        for year, reduced in sorted(results.items()):
+            rain = rain_statistic(reduced, args.rain_statistic)
+            for zone, lake in sorted(zones.items()):
+                tmax = reduced['tmax'][zone]
+                writer.writerow([lake, year, tmax if np.isfinite(tmax) else '',
+                                 rain[zone] if np.isfinite(rain[zone]) else ''])
+    print(f"wrote {len(results)} years ({len(read)} read, {len(results) - len(read)} cached) "
+          f"for {len(zones)} lakes to {args.output}")
+
+    if args.update_registry:
+        year = args.year or max(results)
+        if year not in results:
+            raise SystemExit(f"no input for {year}")
+        reduced = results[year]
+        rain = rain_statistic(reduced, args.rain_statistic)
+        reg = update_registry(registry.load(args.registry),
+                              {lake: (reduced['tmax'][zone], rain[zone]) for zone, lake in zones.items()})
+        reg.save(args.registry)
+        print(f"updated the {year} climate baselines in {args.registry} (version {reg.version})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
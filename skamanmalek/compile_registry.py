@@ -0,0 +1,362 @@
+"""Build lakes.npz from the per-lake Streamlit scripts.
+
+The scripts are parsed with ``ast`` and never executed, so Streamlit does not
+need to be installed. Parsing runs in a process pool and results are cached
+in ``.registry_cache.json`` by file hash, so only edited scripts are parsed
+again. Scripts that cannot be extracted cleanly (repaired, empty, broken)
+and extensionless copies of scripts are reported. Usage::
+
+    python compile_registry.py [--output lakes.npz] [--jobs N] [--report report.json] [--force] [scripts ...]
+
+The registry remembers a digest of what it compiled (``compiled_digest``).
+Tools such as fit.py, climate.py or bootstrap.py rewrite coefficients and
+baselines in place and add arrays of their own; a recompile keeps those
+arrays, and refuses to put the script constants back over rewritten fields
+unless ``--force`` is given.
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import registry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Lake apps are named after their lake (Yale.py, lakeLoughman.py); helper
+# modules such as this one are lower-case
+LAKE_SCRIPT = re.compile(r"^(?:[A-Z]|lake[A-Z])\w*\.py$")
+# Bump when extract() output changes so stale cache entries are dropped
+CACHE_FORMAT = 1
+TITLE = re.compile(r"Estimation in (.+?)</h1>")
+SLOTS = 'bcdefg'
+
+
+class ExtractError(Exception):
+    pass
+
+
+def _parse(source):
+    """Parse a lake script, repairing the known missing-header defect.
+
+    Some scripts lost their ``initial_values = {`` line, which leaves the dict
+    body dangling after ``# Data for Alligator Lake``. The header is put back
+    and the repair is reported as a warning.
+    """
+    try:
+        return ast.parse(source), []
+    except SyntaxError as exc:
+        lines = source.splitlines(keepends=True)
+        lineno = exc.lineno or 0
+        if not (isinstance(exc, IndentationError) and 0 < lineno <= len(lines)
+                and lines[lineno - 1].strip().startswith("'Norm_CyAN'")):
+            raise ExtractError(f"syntax error on line {lineno}: {exc.msg}") from None
+        lines.insert(lineno - 1, "initial_values = {\n")
+        try:
+            tree = ast.parse(''.join(lines))
+        except SyntaxError as retry:
+            raise ExtractError(f"syntax error on line {retry.lineno}: {retry.msg}") from None
+        return tree, [f"line {lineno}: missing 'initial_values = {{' header"]
+
+
+def _read_assignment(node, found):
+    """Record the lake parameter a top-level assignment defines, if any."""
+    target = node.targets[0]
+    if isinstance(target, ast.Name):
+        if target.id in ('initial_values', 'coefficients'):
+            found[target.id] = ast.literal_eval(node.value)
+        elif target.id == 'title_markdown':
+            match = TITLE.search(ast.literal_eval(node.value))
+            if match:
+                found['title'] = match.group(1).strip()
+        elif (target.id == 'final_bloom_magnitude'
+              and isinstance(node.value, ast.BinOp)
+              and isinstance(node.value.op, ast.Mult)):
+            found['scale'] = ast.literal_eval(node.value.right)
+    elif isinstance(target, ast.Tuple):
+        names = [elt.id for elt in target.elts if isinstance(elt, ast.Name)]
+        if len(names) == 6 and [n[0] for n in names] == list(SLOTS):
+            found[f"row{names[0][1:]}"] = [float(v) for v in ast.literal_eval(node.value)]
+
+
+def extract(path):
+    """Return the lake parameters found in one script, plus any warnings."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    if not source.strip():
+        raise ExtractError("file is empty")
+    tree, warnings = _parse(source)
+
+    found = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        try:
+            _read_assignment(node, found)
+        except (ValueError, TypeError, SyntaxError) as exc:
+            # literal_eval names the offending line of a multi-line value
+            at = re.search(r"on line (\d+)", str(exc))
+            raise ExtractError(f"line {at.group(1) if at else node.lineno}: "
+                               f"{ast.unparse(node.targets[0])} is not a plain literal") from None
+
+    missing = [key for key in ('initial_values', 'coefficients', 'scale',
+                               'row1', 'row2', 'row3', 'row4') if key not in found]
+    if missing:
+        raise ExtractError(f"could not find: {', '.join(missing)}")
+
+    try:
+        return _lake(path, found), warnings
+    except (ValueError, TypeError) as exc:
+        raise ExtractError(f"values are not numbers ({exc})") from None
+
+
+def _lake(path, found):
+    """The registry row of one script from its extracted literals."""
+    initial = found['initial_values']
+    coefficients = found['coefficients']
+    for schema_name, schema in registry.SCHEMAS.items():
+        if set(initial) == {'Norm_CyAN', *schema} and set(coefficients) == {'intercept', *schema}:
+            break
+    else:
+        raise ExtractError(f"feature names match no schema: {sorted(initial)}")
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    return {
+        'names': name,
+        'titles': found.get('title', name),
+        'schema': registry.SCHEMA_NAMES.index(schema_name),
+        'norm_cyan': float(initial['Norm_CyAN']),
+        'baseline': [float(initial[f]) for f in schema],
+        'intercept': float(coefficients['intercept']),
+        'coef': [float(coefficients[f]) for f in schema],
+        'norm_lo': found['row1'],
+        'norm_hi': found['row2'],
+        'slider_lo': found['row3'],
+        'slider_hi': found['row4'],
+        'scale': float(found['scale']),
+    }
+
+
+def lake_scripts(folder=HERE):
+    """Every ``*.py`` lake app in ``folder``, in name order."""
+    paths = sorted(glob.glob(os.path.join(folder, '*.py')))
+    return [p for p in paths if LAKE_SCRIPT.match(os.path.basename(p))]
+
+
+def stray_copies(folder=HERE):
+    """Extensionless copies of lake scripts (e.g. ``Arbuckle`` next to ``Arbuckle.py``).
+
+    They are never compiled; each is returned with a note for the report.
+    """
+    notes = []
+    for path in sorted(glob.glob(os.path.join(folder, '*'))):
+        name = os.path.basename(path)
+        if '.' in name or not os.path.isfile(path) or not LAKE_SCRIPT.match(name + '.py'):
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        twin = path + '.py'
+        if not body.strip():
+            notes.append((path, "empty file without .py extension"))
+        elif not os.path.exists(twin):
+            notes.append((path, "no .py extension and no matching .py script"))
+        else:
+            with open(twin, 'rb') as f:
+                same = f.read() == body
+            notes.append((path, f"copy of {name}.py without extension"
+                                + ("" if same else f" that differs from {name}.py")))
+    return notes
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _extract_entry(path):
+    """Cache entry for one script; runs in a worker process."""
+    try:
+        lake, warnings = extract(path)
+        return {'lake': lake, 'warnings': warnings, 'error': None}
+    except ExtractError as exc:
+        return {'lake': None, 'warnings': [], 'error': str(exc)}
+
+
+class ExtractCache:
+    """Extraction results keyed by script path, checked by mtime, size and hash.
+
+    An unchanged mtime and size reuses the entry outright; otherwise the file
+    is hashed and only re-parsed when its content really changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == CACHE_FORMAT:
+                self.entries = data['entries']
+
+    def lookup(self, path):
+        stat = os.stat(path)
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None:
+            return None
+        if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry
+        if entry['sha256'] == _digest(path):
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            return entry
+        return None
+
+    def store(self, path, entry):
+        stat = os.stat(path)
+        entry = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=_digest(path))
+        self.entries[os.path.abspath(path)] = entry
+        return entry
+
+    def save(self):
+        if self.path:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'format': CACHE_FORMAT, 'entries': self.entries}, f)
+
+
+def extract_all(paths, cache=None, jobs=None):
+    """Cache entries for ``paths`` (in order), parsing only what changed."""
+    cache = cache or ExtractCache(None)
+    entries = {path: cache.lookup(path) for path in paths}
+    stale = [path for path, entry in entries.items() if entry is None]
+    if len(stale) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunksize = max(1, len(stale) // (4 * (jobs or os.cpu_count() or 1)))
+            fresh = pool.map(_extract_entry, stale, chunksize=chunksize)
+            for path, entry in zip(stale, fresh):
+                entries[path] = cache.store(path, entry)
+    else:
+        for path in stale:
+            entries[path] = cache.store(path, _extract_entry(path))
+    return [entries[path] for path in paths], len(stale)
+
+
+def fields_digest(reg):
+    """sha256 over the registry's ``FIELDS`` arrays (dtype, shape and data)."""
+    digest = hashlib.sha256()
+    for field in registry.FIELDS:
+        value = np.ascontiguousarray(reg.arrays[field])
+        digest.update(f"{field}:{value.dtype.str}:{value.shape}".encode())
+        digest.update(value.tobytes())
+    return digest.hexdigest()
+
+
+def carry_over(previous, compiled):
+    """Arrays other tools added to ``previous``, realigned to the lakes of ``compiled``.
+
+    Per-lake arrays follow their lake by name; lakes new to the registry get
+    empty fit statistics (zeros) and NaN everywhere else.
+    """
+    rows = np.array([previous._index.get(str(name), -1) for name in compiled.names], dtype=np.intp)
+    carried = {}
+    for key, value in previous.arrays.items():
+        if key in registry.FIELDS or key == 'compiled_digest':
+            continue
+        if value.ndim == 0 or len(value) != len(previous):
+            carried[key] = value
+            continue
+        fill = 0 if key in registry.STATS_FIELDS and key != 'inverse_gram' else np.nan
+        aligned = np.full((len(rows),) + value.shape[1:], fill, dtype=np.result_type(value, type(fill)))
+        aligned[rows >= 0] = value[rows[rows >= 0]]
+        carried[key] = aligned
+    return carried
+
+
+def build(lakes, version=1):
+    """Assemble extracted lakes into a Registry."""
+    arrays = {}
+    for field in registry.FIELDS:
+        values = [lake[field] for lake in lakes]
+        if field in ('names', 'titles'):
+            arrays[field] = np.array(values, dtype=str)
+        elif field == 'schema':
+            arrays[field] = np.array(values, dtype=np.int8)
+        else:
+            arrays[field] = np.array(values, dtype=np.float64)
+    return registry.Registry(arrays, version=version)
+
+
+def compile_scripts(paths, cache=None, jobs=None, log=sys.stderr):
+    """Compile ``paths`` into a Registry and a report of what was not clean."""
+    entries, parsed = extract_all(paths, cache, jobs)
+    lakes = []
+    report = {'compiled': [], 'repaired': {}, 'skipped': {}, 'ignored': {}, 'parsed': parsed}
+    for path, entry in zip(paths, entries):
+        name = os.path.basename(path)
+        if entry['error']:
+            report['skipped'][name] = entry['error']
+            print(f"skipped {name}: {entry['error']}", file=log)
+            continue
+        if entry['warnings']:
+            report['repaired'][name] = entry['warnings']
+            for warning in entry['warnings']:
+                print(f"repaired {name}: {warning}", file=log)
+        report['compiled'].append(name)
+        lakes.append(entry['lake'])
+    return build(lakes), report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the lake scripts into lakes.npz")
+    parser.add_argument('scripts', nargs='*', help="lake scripts (default: every lake *.py here)")
+    parser.add_argument('--output', default=registry.DEFAULT_PATH)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--cache', default=os.path.join(HERE, '.registry_cache.json'),
+                        help="extraction cache file ('' disables caching)")
+    parser.add_argument('--report', help="also write the extraction report to this JSON file")
+    parser.add_argument('--force', action='store_true',
+                        help="replace coefficients and baselines rewritten by other tools")
+    args = parser.parse_args(argv)
+
+    cache = ExtractCache(args.cache or None)
+    compiled, report = compile_scripts(args.scripts or lake_scripts(), cache, args.jobs)
+    cache.save()
+    if not args.scripts:
+        for path, note in stray_copies():
+            report['ignored'][os.path.basename(path)] = note
+            print(f"ignored {os.path.basename(path)}: {note}", file=sys.stderr)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    # Leave the file (and its version) alone when the lake data did not change
+    digest = fields_digest(compiled)
+    if os.path.exists(args.output):
+        previous = registry.load(args.output)
+        source = str(previous.arrays['compiled_digest']) if 'compiled_digest' in previous.arrays else None
+        current = fields_digest(previous)
+        if digest == current or (digest == source and not args.force):
+            if source is None:
+                # Older file without a digest: record it, the data stay as they are
+                previous.replace(bump=False, compiled_digest=np.array(digest)).save(args.output)
+            print(f"{args.output} is up to date ({len(compiled)} lakes, {report['parsed']} parsed)")
+            return
+        if current != source and digest != source and not args.force:
+            raise SystemExit(f"{args.output} holds coefficients or baselines rewritten since it was compiled "
+                             f"(fit.py, climate.py, ...); rerun with --force to replace them with the script "
+                             f"values or compile to another --output")
+        # Keep what other tools added (fit statistics, bootstrap intervals, ...)
+        compiled = registry.Registry(dict(compiled.arrays, **carry_over(previous, compiled)),
+                                     version=previous.version + 1)
+    compiled = compiled.replace(bump=False, compiled_digest=np.array(digest))
+    compiled.save(args.output)
+    print(f"wrote {len(compiled)} lakes to {args.output} "
+          f"(version {compiled.version}, {report['parsed']} parsed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Per-lake annual CyAN statistics from daily cyanobacteria-index rasters.
+
+Reads every daily CyAN tile of one year from a directory (GeoTIFF through
+rasterio, or ``.npy`` fixtures), a strip of rows at a time, and folds each
+strip into per-lake running sums, so a statewide year is processed in one
+pass with memory bounded by the window size. The tile date comes from the
+CyAN file name (``L2022123...`` = year 2022, day 123).
+
+CyAN digital numbers: 0 is below detection (CI 0), 1-253 map to the
+cyanobacteria index ``CI = 10 ** (3 / 250 * DN - 4.2)``, 254 is land and 255
+no data. Each day contributes the lake's mean over its valid pixels; the
+annual statistic averages those daily means (``mean_dn`` / ``mean_ci``) or
+takes their maximum (``max_dn``). Usage::
+
+    python cyan_ingest.py tiles/ --labels lakes.tif --zones zones.csv --year 2022 \\
+        [--statistic mean_dn] [--output norm_cyan.csv] [--update-registry]
+
+``zones.csv`` maps label values to lakes (columns ``zone,lake``); with
+``--polygons lakes.geojson`` the polygons are rasterized onto the tile grid
+instead. The output CSV has one row per lake with the statistic in a
+``Norm_CyAN`` column, ready to replace ``initial_values['Norm_CyAN']``.
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+import numpy as np
+
+import registry
+import zonal
+
+BELOW_DETECTION, LAND, NO_DATA = 0, 254, 255
+STATISTICS = ('mean_dn', 'mean_ci', 'max_dn')
+TILE_DATE = re.compile(r'L(\d{4})(\d{3})')
+
+
+def cyanobacteria_index(dn):
+    """CI for CyAN digital numbers (0 below detection)."""
+    dn = np.asarray(dn, dtype=np.float64)
+    return np.where(dn > BELOW_DETECTION, 10.0 ** (3.0 / 250.0 * dn - 4.2), 0.0)
+
+
+def daily_tiles(folder, year):
+    """``(day of year, path)`` for the CyAN tiles of ``year``, in date order."""
+    tiles = []
+    for name in sorted(os.listdir(folder)):
+        match = TILE_DATE.search(name)
+        if match and int(match.group(1)) == year and (zonal.is_geotiff(name) or name.endswith('.npy')):
+            tiles.append((int(match.group(2)), os.path.join(folder, name)))
+    return sorted(tiles)
+
+
+class AnnualStats:
+    """Running per-lake statistics over daily lake means."""
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.days = np.zeros(zones + 1, dtype=np.int64)
+        self.pixels = np.zeros(zones + 1, dtype=np.int64)
+        self.dn_total = np.zeros(zones + 1)
+        self.ci_total = np.zeros(zones + 1)
+        self.dn_max = np.full(zones + 1, -np.inf)
+
+    def add_day(self, count, dn_sum, ci_sum):
+        seen = count > 0
+        safe = np.maximum(count, 1)
+        self.days += seen
+        self.pixels += count
+        self.dn_total += np.where(seen, dn_sum / safe, 0.0)
+        self.ci_total += np.where(seen, ci_sum / safe, 0.0)
+        self.dn_max = np.where(seen, np.maximum(self.dn_max, dn_sum / safe), self.dn_max)
+
+    def statistic(self, name):
+        days = np.where(self.days > 0, self.days, np.nan)
+        if name == 'mean_dn':
+            return self.dn_total / days
+        if name == 'mean_ci':
+            return self.ci_total / days
+        if name == 'max_dn':
+            return np.where(self.days > 0, self.dn_max, np.nan)
+        raise ValueError(f"statistic must be one of {', '.join(STATISTICS)}")
+
+
+def ingest(tiles, labels_path, zones, polygons=None, rows=zonal.WINDOW_ROWS):
+    """Fold the daily ``(day, path)`` tiles into an :class:`AnnualStats`.
+
+    Tiles of the same day (several CyAN tiles cover the state) are summed
+    before the day's lake means are taken.
+    """
+    stats = AnnualStats(zones)
+    labels_by_grid = {}
+    day, count, dn_sum, ci_sum = None, None, None, None
+    for tile_day, path in tiles:
+        if tile_day != day:
+            if day is not None:
+                stats.add_day(count, dn_sum, ci_sum)
+            day = tile_day
+            count = np.zeros(zones + 1, dtype=np.int64)
+            dn_sum, ci_sum = np.zeros(zones + 1), np.zeros(zones + 1)
+        # Tiles on the same grid share one label raster (rasterized once)
+        grid = zonal.raster_grid(path)
+        if grid not in labels_by_grid:
+            labels_by_grid[grid] = (zonal.read_labels(path, polygons=polygons) if polygons
+                                    else zonal.read_labels(labels_path, grid[0]))
+        labels = labels_by_grid[grid]
+        for strip, block in zonal.read_windows(path, rows):
+            valid = block < LAND
+            strip_labels = np.asarray(labels[strip])
+            n, dn = zonal.zone_sums(strip_labels, block, zones, valid)
+            _, ci = zonal.zone_sums(strip_labels, cyanobacteria_index(block), zones, valid)
+            count += n
+            dn_sum += dn
+            ci_sum += ci
+    if day is not None:
+        stats.add_day(count, dn_sum, ci_sum)
+    return stats
+
+
+def update_registry(reg, values):
+    """A new registry version with ``Norm_CyAN`` replaced for ``{lake: value}``."""
+    norm_cyan = reg.norm_cyan.copy()
+    for lake, value in values.items():
+        if lake in reg and np.isfinite(value):
+            norm_cyan[reg.index(lake)] = value
+    return reg.replace(norm_cyan=norm_cyan)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annual per-lake CyAN statistics from daily rasters")
+    parser.add_argument('tiles', help="directory of daily CyAN GeoTIFF (or .npy) tiles")
+    parser.add_argument('--year', type=int, required=True)
+    parser.add_argument('--zones', required=True, help="zone,lake CSV naming the label values")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--labels', help="lake label raster on the tile grid (.tif or .npy)")
+    where.add_argument('--polygons', help="GeoJSON lake polygons with a 'zone' property")
+    parser.add_argument('--statistic', choices=STATISTICS, default='mean_dn')
+    parser.add_argument('--rows', type=int, default=zonal.WINDOW_ROWS, help="raster rows read per window")
+    parser.add_argument('--output', default='norm_cyan.csv')
+    parser.add_argument('--update-registry', action='store_true', help="write the values into the registry")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    zones = zonal.read_zones(args.zones)
+    tiles = daily_tiles(args.tiles, args.year)
+    if not tiles:
+        raise SystemExit(f"no {args.year} tiles in {args.tiles}")
+    stats = ingest(tiles, args.labels, max(zones), args.polygons, args.rows)
+    values = stats.statistic(args.statistic)
+
+    results = {}
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['lake', 'year', 'days', 'pixels', 'Norm_CyAN'])
+        for zone, lake in sorted(zones.items()):
+            results[lake] = values[zone]
+            writer.writerow([lake, args.year, stats.days[zone], stats.pixels[zone],
+                             values[zone] if np.isfinite(values[zone]) else ''])
+    unseen = [lake for lake, value in results.items() if not np.isfinite(value)]
+    if unseen:
+        print(f"no valid pixels for: {', '.join(unseen)}", file=sys.stderr)
+    print(f"wrote {args.statistic} for {len(results)} lakes over {len(tiles)} tiles to {args.output}")
+
+    if args.update_registry:
+        reg = update_registry(registry.load(args.registry), results)
+        reg.save(args.registry)
+        print(f"updated Norm_CyAN in {args.registry} (version {reg.version})")
+
+
+if __name__ == '__main__':
+    main()
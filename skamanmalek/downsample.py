@@ -0,0 +1,214 @@
+"""Downsampled views of the daily CyAN histories.
+
+Two reductions keep long histories cheap to send and draw:
+
+* a min/max pyramid per lake, precomputed next to the history store: level
+  ``k`` summarizes buckets of ``4 ** k`` days as (min, max, sum, count), each
+  level built from the one below in one reshape. A view picks the finest
+  level that fits the requested number of points, so a zoomed-out chart
+  reads a few hundred buckets instead of decades of days, and spikes stay
+  visible as the bucket's min/max band;
+* Largest-Triangle-Three-Buckets (``lttb``) for a raw slice, when the shape
+  of the line matters more than the extremes.
+
+The pyramid is built by ``history.py import`` or ``downsample.py build``;
+every file is written aside and moved into place, so readers (the app) only
+ever open complete files and never write. Usage::
+
+    python downsample.py build [--store history/]
+    python downsample.py show Yale --points 500 [--start 2015-01-01] [--method lttb]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+import history
+
+FACTOR = 4
+MIN_BUCKETS = 64
+STATS = 4    # min, max, sum, count
+
+View = namedtuple('View', 'days low high mean level')
+
+
+def lttb(x, y, points):
+    """Indices of the ``points`` samples LTTB keeps from ``(x, y)``."""
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    keep = np.empty(points, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _save(path, array):
+    """``np.save`` to a temporary file moved over ``path``."""
+    tmp = path + '.tmp.npy'
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _reduce(stats, factor):
+    """Next pyramid level: ``(4, lakes, buckets)`` -> ``(4, lakes, buckets / factor)``."""
+    buckets = -(-stats.shape[2] // factor)
+    padded = np.full(stats.shape[:2] + (buckets * factor,), np.nan, dtype=np.float32)
+    padded[:, :, :stats.shape[2]] = stats
+    padded[2:, :, stats.shape[2]:] = 0
+    grouped = padded.reshape(STATS, stats.shape[1], buckets, factor)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # all-NaN buckets stay NaN
+        return np.stack([np.nanmin(grouped[0], axis=-1), np.nanmax(grouped[1], axis=-1),
+                         grouped[2].sum(axis=-1), grouped[3].sum(axis=-1)]).astype(np.float32)
+
+
+class Pyramid:
+    """Memory-mapped min/max levels of a :class:`history.Store`."""
+
+    def __init__(self, store):
+        self.store = store
+        self.folder = os.path.join(store.path, 'pyramid')
+        with open(os.path.join(self.folder, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.days = meta['days']
+        self.stamp = meta['stamp']
+        self.factor = meta['factor']
+        self.levels = [np.load(os.path.join(self.folder, f'level_{k}.npy'), mmap_mode='r')
+                       for k in range(1, meta['levels'] + 1)]
+
+    @classmethod
+    def build(cls, store, factor=FACTOR, min_buckets=MIN_BUCKETS):
+        """(Re)build every level from the store's raw days."""
+        folder = os.path.join(store.path, 'pyramid')
+        os.makedirs(folder, exist_ok=True)
+        raw = np.asarray(store.values[:, :store.days])
+        seen = ~np.isnan(raw)
+        stats = np.stack([raw, raw, np.where(seen, raw, 0), seen]).astype(np.float32)
+        levels = 0
+        while stats.shape[2] > min_buckets or levels == 0:
+            stats = _reduce(stats, factor)
+            levels += 1
+            _save(os.path.join(folder, f'level_{levels}.npy'), stats)
+        tmp = os.path.join(folder, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'days': store.days, 'stamp': store._stamp, 'factor': factor, 'levels': levels}, f)
+        os.replace(tmp, os.path.join(folder, 'meta.json'))
+        return cls(store)
+
+    @classmethod
+    def load(cls, store, rebuild=False):
+        """The store's pyramid, or None when there is none.
+
+        A pyramid older than the store is returned as it is (see ``stale``)
+        unless ``rebuild`` is set, which rebuilds missing or stale pyramids.
+        """
+        if os.path.exists(os.path.join(store.path, 'pyramid', 'meta.json')):
+            pyramid = cls(store)
+            if not (rebuild and pyramid.stale):
+                return pyramid
+        return cls.build(store) if rebuild else None
+
+    @property
+    def stale(self):
+        """True when the store was written after the pyramid was built."""
+        return self.stamp != self.store.refresh()._stamp
+
+    def view(self, lake, start=None, end=None, points=1000):
+        """Min/max/mean of ``lake`` over ``[start, end)`` in at most ~``points`` buckets.
+
+        Only the days the pyramid was built over are shown.
+        """
+        built = self.store.start + np.timedelta64(self.days, 'D')
+        end = built if end is None else min(np.datetime64(end, 'D'), built)
+        days, values = self.store.series(lake, start, end)
+        if len(days) <= points:
+            values = values.astype(np.float64)
+            return View(days, values, values, values, 0)
+        first = int((days[0] - self.store.start) // np.timedelta64(1, 'D'))
+        row = self.store._index[lake]
+        for k, level in enumerate(self.levels, 1):
+            size = self.factor ** k
+            lo, hi = first // size, -(-(first + len(days)) // size)
+            if hi - lo <= points or k == len(self.levels):
+                stats = np.asarray(level[:, row, lo:hi], dtype=np.float64)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = np.where(stats[3] > 0, stats[2] / stats[3], np.nan)
+                bucket_days = self.store.start + np.arange(lo, hi) * size
+                return View(bucket_days, stats[0], stats[1], mean, k)
+
+
+def lttb_view(store, lake, start=None, end=None, points=1000):
+    """LTTB-reduced raw slice of ``lake`` as a :class:`View` (level 0)."""
+    days, values = store.series(lake, start, end)
+    seen = ~np.isnan(values)
+    days, values = days[seen], values[seen].astype(np.float64)
+    keep = lttb(days.astype(np.float64), values, points)
+    return View(days[keep], values[keep], values[keep], values[keep], 0)
+
+
+def chart(view):
+    """Vega-Lite chart of a view: the mean line over the min/max band."""
+    seen = ~np.isnan(view.mean)
+    rows = [{'date': str(day), 'mean': mean, 'low': low, 'high': high}
+            for day, mean, low, high in zip(view.days[seen], view.mean[seen].round(4).tolist(),
+                                            view.low[seen].round(4).tolist(), view.high[seen].round(4).tolist())]
+    x = {'field': 'date', 'type': 'temporal', 'title': None}
+    layers = [{'mark': {'type': 'line'},
+               'encoding': {'x': x, 'y': {'field': 'mean', 'type': 'quantitative', 'title': 'Daily CyAN'}}}]
+    if view.level:
+        layers.insert(0, {'mark': {'type': 'area', 'opacity': 0.3},
+                          'encoding': {'x': x, 'y': {'field': 'low', 'type': 'quantitative'},
+                                       'y2': {'field': 'high'}}})
+    return {'data': {'values': rows}, 'layer': layers}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Downsampled CyAN history views")
+    parser.add_argument('--store', default=history.DEFAULT_PATH, help="history store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="(re)build the min/max pyramid")
+    build.add_argument('--factor', type=int, default=FACTOR, help="days merged per level step")
+    show = commands.add_parser('show', help="print a downsampled view")
+    show.add_argument('lake')
+    show.add_argument('--start')
+    show.add_argument('--end')
+    show.add_argument('--points', type=int, default=1000)
+    show.add_argument('--method', choices=('minmax', 'lttb'), default='minmax')
+    args = parser.parse_args(argv)
+
+    store = history.load(args.store)
+    if store is None:
+        raise SystemExit(f"no history store at {args.store}")
+    if args.command == 'build':
+        pyramid = Pyramid.build(store, args.factor)
+        print(f"built {len(pyramid.levels)} levels over {store.days} days for {len(store.lakes)} lakes")
+        return
+    if args.lake not in store:
+        raise SystemExit(f"no history for {args.lake}")
+    if args.method == 'lttb':
+        view = lttb_view(store, args.lake, args.start, args.end, args.points)
+    else:
+        view = Pyramid.load(store, rebuild=True).view(args.lake, args.start, args.end, args.points)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['date', 'low', 'high', 'mean'])
+    for row in zip(view.days, view.low, view.high, view.mean):
+        writer.writerow(row)
+    print(f"level {view.level}: {len(view.days)} points", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Bloom events in the daily CyAN histories of every lake.
+
+A lake enters a bloom when its daily value reaches the ``on`` threshold and
+leaves it when the value drops below ``off`` (``0 < off < on``); values in
+between, and days without data, keep the current state. That hysteresis is
+a forward fill of the last decisive day, so a block of days is processed for
+all lakes at once with array operations, no per-day loop. Each closed event
+records its onset, end and peak; a bloom still running at the end of the
+block is carried over, so appending days only processes the new ones.
+The detector remembers the store revision it has seen; when a later write
+touched a day it had already processed (a correction or a backfill), it
+detects again from the first day.
+
+The detector state lives in ``events.npz`` inside the history store and is
+brought up to date with :func:`update` (run by ``history.py import`` and
+this script; the file is written aside and moved into place, and readers
+such as the app only :func:`load` it). Unless given, each lake's thresholds
+are the 90th (``on``) and 75th (``off``) percentiles of its days with a
+nonzero value, taken whenever the detector is built. Usage::
+
+    python events.py [--store history/] [--on 120 --off 100] [--rebuild] [--lake Yale]
+"""
+import argparse
+import csv
+import os
+import sys
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+import history
+
+ON_QUANTILE, OFF_QUANTILE = 0.90, 0.75
+OFF_FRACTION = 0.5   # off as a fraction of on when the quantiles coincide
+CHUNK_DAYS = 4096
+
+Summary = namedtuple('Summary', 'events per_year mean_duration mean_interval max_peak '
+                                'last_onset last_duration last_peak ongoing_since')
+
+
+class Detector:
+    """Threshold-with-hysteresis bloom detector over ``(lakes, days)`` blocks."""
+
+    ARRAYS = ('on', 'off', 'state', 'onset', 'peak', 'event_lake', 'event_onset', 'event_end', 'event_peak')
+
+    def __init__(self, on, off, min_duration=1):
+        self.on = np.asarray(on, dtype=np.float64)
+        self.off = np.minimum(np.asarray(off, dtype=np.float64), self.on)
+        self.min_duration = int(min_duration)
+        lakes = len(self.on)
+        self.through = 0                                # days processed
+        self.revision = 0                               # store revision processed
+        self.fixed = np.zeros(2, dtype=bool)            # on, off given rather than defaulted
+        self.state = np.zeros(lakes, dtype=bool)        # in a bloom after the last day
+        self.onset = np.full(lakes, -1, dtype=np.int64)
+        self.peak = np.full(lakes, -np.inf)
+        self.event_lake = np.empty(0, dtype=np.int64)
+        self.event_onset = np.empty(0, dtype=np.int64)
+        self.event_end = np.empty(0, dtype=np.int64)    # exclusive
+        self.event_peak = np.empty(0)
+
+    def step(self, block):
+        """Fold the next ``(lakes, days)`` block of daily values into the state."""
+        block = np.asarray(block, dtype=np.float64)
+        lakes, days = block.shape
+        if not days:
+            return
+        first = self.through
+        rows = np.arange(lakes)
+
+        # Hysteresis: the state on a day is that of the last decisive day (>= on or < off)
+        decisive = np.where(block >= self.on[:, None], 1, np.where(block < self.off[:, None], 0, -1))
+        last = np.maximum.accumulate(np.where(decisive >= 0, np.arange(days), -1), axis=1)
+        state = np.where(last >= 0, decisive[rows[:, None], np.maximum(last, 0)] == 1, self.state[:, None])
+        before = np.concatenate([self.state[:, None], state[:, :-1]], axis=1)
+        starts, ends = state & ~before, ~state & before
+
+        # Event k of a row (0 = the one carried in); peak per (row, k) over its bloom days
+        number = np.cumsum(starts, axis=1)
+        key = rows[:, None] * (days + 1) + number
+        keys, inverse = np.unique(key[state], return_inverse=True)
+        peaks = np.full(len(keys), -np.inf)
+        np.maximum.at(peaks, inverse, np.where(np.isnan(block), -np.inf, block)[state])
+
+        # Sentinels so lookups of missing entries stay in bounds
+        keys, peaks = np.append(keys, -1), np.append(peaks, -np.inf)
+        start_row, start_day = np.nonzero(starts)
+        start_day = np.append(start_day, 0)
+        offset = np.concatenate([[0], np.cumsum(starts.sum(axis=1))])[:-1]
+
+        def peak_of(row, k):
+            wanted = row * (days + 1) + k
+            at = np.minimum(np.searchsorted(keys[:-1], wanted), len(keys) - 1)
+            value = np.where(keys[at] == wanted, peaks[at], -np.inf)
+            return np.where(k == 0, np.maximum(value, self.peak[row]), value)
+
+        def onset_of(row, k):
+            at = np.where(k == 0, len(start_day) - 1, offset[row] + k - 1)
+            return np.where(k == 0, self.onset[row], first + start_day[at])
+
+        end_row, end_day = np.nonzero(ends)
+        k = number[end_row, end_day]
+        onset, end = onset_of(end_row, k), first + end_day
+        keep = end - onset >= self.min_duration
+        self.event_lake = np.concatenate([self.event_lake, end_row[keep]])
+        self.event_onset = np.concatenate([self.event_onset, onset[keep]])
+        self.event_end = np.concatenate([self.event_end, end[keep]])
+        self.event_peak = np.concatenate([self.event_peak, peak_of(end_row, k)[keep]])
+
+        # Carry the blooms still running
+        k_last = number[:, -1]
+        self.state = state[:, -1]
+        self.onset = np.where(self.state, onset_of(rows, k_last), -1)
+        self.peak = np.where(self.state, peak_of(rows, k_last), -np.inf)
+        self.through = first + days
+
+    def save(self, path):
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, through=self.through, min_duration=self.min_duration, revision=self.revision,
+                 fixed=self.fixed,
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            detector = cls(data['on'], data['off'], int(data['min_duration']))
+            detector.through = int(data['through'])
+            if 'revision' in data.files:
+                detector.revision, detector.fixed = int(data['revision']), data['fixed']
+            for name in cls.ARRAYS:
+                setattr(detector, name, data[name])
+        return detector
+
+    def summary(self, lake, days_observed):
+        """:class:`Summary` for one lake index; days are offsets from the store's start."""
+        mine = self.event_lake == lake
+        onset, end, peak = self.event_onset[mine], self.event_end[mine], self.event_peak[mine]
+        duration = end - onset
+        years = max(days_observed / 365.25, 1 / 365.25)
+        return Summary(
+            events=int(mine.sum()),
+            per_year=float(mine.sum() / years),
+            mean_duration=float(duration.mean()) if len(duration) else None,
+            mean_interval=float(np.diff(onset).mean()) if len(onset) > 1 else None,
+            max_peak=float(max(peak.max(initial=-np.inf), self.peak[lake])) if len(peak) or self.state[lake] else None,
+            last_onset=int(onset[-1]) if len(onset) else None,
+            last_duration=int(duration[-1]) if len(duration) else None,
+            last_peak=float(peak[-1]) if len(peak) else None,
+            ongoing_since=int(self.onset[lake]) if self.state[lake] else None,
+        )
+
+
+def default_thresholds(store):
+    """Per-lake ``(on, off)`` from the percentiles of each lake's nonzero days.
+
+    Zeros (no detectable bloom) are left out: on a record that is mostly zero
+    they would put ``off`` at 0, and a bloom could then never end.
+    """
+    values = np.asarray(store.values[:, :store.days], dtype=np.float64)
+    values[~(values > 0)] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # lakes without data get NaN
+        on, off = np.nanquantile(values, [ON_QUANTILE, OFF_QUANTILE], axis=1)
+    # Ties in a short or discrete record leave no gap between the two
+    off = np.where(off < on, off, on * OFF_FRACTION)
+    return np.where(np.isnan(on), np.inf, on), np.where(np.isnan(off), np.inf, off)
+
+
+def load(store):
+    """The store's detector as last saved (``through`` may lag the store), or None."""
+    path = os.path.join(store.path, 'events.npz')
+    return Detector.load(path) if os.path.exists(path) else None
+
+
+def update(store, on=None, off=None, min_duration=1, rebuild=False, chunk=CHUNK_DAYS):
+    """The store's detector, with every day written since the last update folded in."""
+    path = os.path.join(store.path, 'events.npz')
+    store.refresh()
+    detector = Detector.load(path) if os.path.exists(path) and not rebuild else None
+    if detector is not None:
+        dirty = store.changed_since(detector.revision)
+        if dirty is None and detector.through == store.days:
+            return detector
+        if dirty is not None and dirty < detector.through:
+            # Days already processed were rewritten or backfilled; thresholds given before still hold
+            on = detector.on if detector.fixed[0] else None
+            off = detector.off if detector.fixed[1] else None
+            min_duration, detector = detector.min_duration, None
+    if detector is None:
+        fixed = np.array([on is not None, off is not None])
+        if on is None or off is None:
+            default_on, default_off = default_thresholds(store)
+            on = default_on if on is None else on
+            off = default_off if off is None else off
+        detector = Detector(np.broadcast_to(on, len(store.lakes)), np.broadcast_to(off, len(store.lakes)),
+                            min_duration)
+        detector.fixed = fixed
+    for start in range(detector.through, store.days, chunk):
+        detector.step(store.values[:, start:min(start + chunk, store.days)])
+    detector.revision = store.revision
+    detector.save(path)
+    return detector
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect bloom events in the daily CyAN histories")
+    parser.add_argument('--store', default=history.DEFAULT_PATH, help="history store directory")
+    parser.add_argument('--on', type=float, help="bloom onset threshold (default: per-lake 90th percentile)")
+    parser.add_argument('--off', type=float, help="bloom end threshold (default: per-lake 75th percentile)")
+    parser.add_argument('--min-duration', type=int, default=1, help="shortest event kept, in days")
+    parser.add_argument('--rebuild', action='store_true', help="start over instead of updating")
+    parser.add_argument('--lake', nargs='*', help="lakes to summarize (default: all)")
+    args = parser.parse_args(argv)
+    if args.off is not None and args.off <= 0:
+        raise SystemExit("--off must be positive, or a bloom can never end")
+    if args.on is not None and args.off is not None and args.off >= args.on:
+        raise SystemExit("--off must be below --on")
+
+    store = history.load(args.store)
+    if store is None:
+        raise SystemExit(f"no history store at {args.store}")
+    detector = update(store, args.on, args.off, args.min_duration, args.rebuild)
+    print(f"{len(detector.event_lake)} events over {store.days} days", file=sys.stderr)
+
+    def cell(value, day=False):
+        if value is None:
+            return ''
+        return str(store.start + value) if day else value
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['lake', 'events', 'per_year', 'mean_duration', 'mean_interval', 'max_peak',
+                     'last_onset', 'last_duration', 'last_peak', 'ongoing_since'])
+    for lake in args.lake or store.lakes:
+        s = detector.summary(store._index[lake], store.days)
+        writer.writerow([lake, s.events, round(s.per_year, 3), cell(s.mean_duration), cell(s.mean_interval),
+                         cell(s.max_peak), cell(s.last_onset, day=True), cell(s.last_duration),
+                         cell(s.last_peak), cell(s.ongoing_since, day=True)])
+
+
+if __name__ == '__main__':
+    main()
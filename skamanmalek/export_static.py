@@ -0,0 +1,45 @@
+"""Export every lake estimator as a static, server-free site.
+
+The bundle holds one shared runtime (``cyan.js``/``cyan.css``), one
+``index.html`` and a single ``lakes.json`` with the model of every lake, so a
+visitor downloads the runtime once and can then switch lakes
+(``index.html#Yale``) without further requests. Any static host or CDN can
+serve it. Usage::
+
+    python export_static.py site/ [--registry lakes.npz]
+"""
+import argparse
+import json
+import os
+import shutil
+
+import client
+import registry
+
+RUNTIME = ('index.html', 'cyan.js', 'cyan.css')
+
+
+def export(destination, reg):
+    os.makedirs(destination, exist_ok=True)
+    for name in RUNTIME:
+        shutil.copyfile(os.path.join(client.STATIC, name), os.path.join(destination, name))
+    # The picker tells lakes sharing a title apart the way the app does
+    labels = reg.display_titles()
+    lakes = [dict(client.lake_payload(reg, str(name)), label=labels[str(name)]) for name in reg.names]
+    with open(os.path.join(destination, 'lakes.json'), 'w', encoding='utf-8') as f:
+        json.dump(lakes, f, separators=(',', ':'))
+    return len(lakes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the lake estimators as a static site")
+    parser.add_argument('destination', help="output directory")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    count = export(args.destination, registry.load(args.registry))
+    print(f"exported {count} lakes to {args.destination}")
+
+
+if __name__ == '__main__':
+    main()
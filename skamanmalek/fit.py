@@ -0,0 +1,170 @@
+"""Refit every lake's regression from annual observations.
+
+The input is a long table (CSV or Parquet) with one row per lake and year::
+
+    lake,year,Norm_CyAN,AVFST_Max,ARAIN_Average,HUC12_forest_and_shrubland_4,...
+
+``lake`` is the script name or title. Each lake is fitted on its own model
+features, normalized with the lake's ``b1/b2 .. g1/g2`` bounds exactly as the
+app does, against ``Norm_CyAN / 194.0458755`` (the app's denormalizer undone).
+All lakes are solved together: the per-lake normal equations are accumulated
+in one pass and handed to a single batched ``np.linalg.solve``; lakes whose
+system is singular fall back to the pseudo-inverse. Rows are ordered by lake
+and year first, so a refit is deterministic. Usage::
+
+    python fit.py observations.csv [--output lakes.npz] [--renormalize] [--ridge 0]
+
+The result is a new registry version. Alongside the coefficients it stores
+each lake's sufficient statistics (``gram`` = XᵀX, ``moment`` = Xᵀy, ``yy`` =
+yᵀy and ``nobs``) so later updates need not revisit the rows. Lakes with
+fewer rows than parameters keep their current coefficients.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import batch
+import registry
+
+TARGET = 'Norm_CyAN'
+YEAR = 'year'
+PARAMETERS = 7   # intercept + six features
+
+
+def read_table(path):
+    if batch._is_parquet(path):
+        _, pq = batch._import_pyarrow()
+        return pq.read_table(path).to_pandas()
+    return batch.pd.read_csv(path)
+
+
+def design(reg, table, renormalize=False):
+    """``(lake_index, X, y, norm_lo, norm_hi)`` for the rows of ``table``.
+
+    ``X`` is ``(rows, 7)`` with a leading column of ones. Rows naming an
+    unknown lake (or a title shared by several lakes) or missing one of the
+    lake's inputs are dropped. With ``renormalize`` the bounds become each
+    lake's min/max over its rows, except for inputs constant over them.
+    """
+    shared = reg.shared_titles()
+    lookup = {str(t): i for i, t in enumerate(reg.titles) if str(t) not in shared}
+    lookup.update((str(n), i) for i, n in enumerate(reg.names))
+    lakes = table[batch.LAKE_COLUMN].astype(str).str.strip().map(lookup)
+    table = table.assign(_lake=lakes).dropna(subset=['_lake'])
+    table = table.sort_values(['_lake', YEAR], kind='stable')
+
+    norm_lo, norm_hi = reg.norm_lo.copy(), reg.norm_hi.copy()
+    index, raw, target = [], [], []
+    for i, rows in table.groupby('_lake', sort=True):
+        i = int(i)
+        columns = [TARGET, *reg.features(str(reg.names[i]))]
+        rows = rows.reindex(columns=columns).apply(batch.pd.to_numeric, errors='coerce').dropna()
+        if rows.empty:
+            continue
+        values = rows.to_numpy(dtype=np.float64)
+        if renormalize:
+            # A constant input has no range to normalize over; it keeps its bounds
+            lo, hi = values[:, 1:].min(axis=0), values[:, 1:].max(axis=0)
+            varies = hi > lo
+            norm_lo[i, varies], norm_hi[i, varies] = lo[varies], hi[varies]
+        index.append(np.full(len(values), i, dtype=np.intp))
+        raw.append(values[:, 1:])
+        target.append(values[:, 0] / reg.scale[i])
+    if not index:
+        return (np.empty(0, dtype=np.intp), np.empty((0, PARAMETERS)), np.empty(0), norm_lo, norm_hi)
+
+    index = np.concatenate(index)
+    span = norm_hi - norm_lo
+    span = np.where(span != 0, span, 1.0)
+    normalized = (np.concatenate(raw) - norm_lo[index]) / span[index]
+    X = np.column_stack([np.ones(len(index)), normalized])
+    return index, X, np.concatenate(target), norm_lo, norm_hi
+
+
+def normal_equations(index, X, y, lakes, weights=None):
+    """Per-lake ``(gram, moment, yy, nobs)`` from rows tagged with ``index``.
+
+    Rows must be grouped by lake (as :func:`design` returns them). ``weights``
+    weights each row; a ``(replicates, rows)`` array yields one set of
+    statistics per replicate, each reduced with the same segmented sum.
+    """
+    p = X.shape[1]
+    w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    gram = np.zeros(w.shape[:-1] + (lakes, p, p))
+    moment = np.zeros(w.shape[:-1] + (lakes, p))
+    yy = np.zeros(w.shape[:-1] + (lakes,))
+    nobs = np.zeros(w.shape[:-1] + (lakes,))
+    if not len(y):
+        return gram, moment, yy, nobs
+    present, starts = np.unique(index, return_index=True)
+    # One row per observation: vec(x xᵀ), x y, y², 1 -- summed per lake segment
+    terms = np.column_stack([(X[:, :, None] * X[:, None, :]).reshape(len(y), p * p),
+                             X * y[:, None], y * y, np.ones(len(y))])
+    sums = np.add.reduceat(w[..., None] * terms, starts, axis=-2)
+    gram[..., present, :, :] = sums[..., :p * p].reshape(sums.shape[:-1] + (p, p))
+    moment[..., present, :] = sums[..., p * p:p * p + p]
+    yy[..., present] = sums[..., -2]
+    nobs[..., present] = sums[..., -1]
+    return gram, moment, yy, nobs
+
+
+def solve(gram, moment, ridge=0.0):
+    """Batched least-squares coefficients from the normal equations.
+
+    Lakes whose Gram matrix is singular (or nearly) get the minimum-norm
+    solution through the pseudo-inverse instead.
+    """
+    gram = gram + ridge * np.eye(gram.shape[-1])
+    beta = np.empty(moment.shape)
+    regular = np.linalg.cond(gram) < 1e12
+    if regular.any():
+        beta[regular] = np.linalg.solve(gram[regular], moment[regular][..., None])[..., 0]
+    if (~regular).any():
+        beta[~regular] = np.einsum('...pq,...q->...p', np.linalg.pinv(gram[~regular]), moment[~regular])
+    return beta
+
+
+def refit(reg, table, renormalize=False, ridge=0.0, min_rows=PARAMETERS):
+    """Fit every lake in ``table``; returns ``(new_registry, fitted_lake_names)``."""
+    index, X, y, norm_lo, norm_hi = design(reg, table, renormalize)
+    gram, moment, yy, nobs = normal_equations(index, X, y, len(reg))
+    fitted = nobs >= min_rows
+    beta = solve(gram[fitted], moment[fitted], ridge)
+
+    intercept, coef = reg.intercept.copy(), reg.coef.copy()
+    intercept[fitted], coef[fitted] = beta[:, 0], beta[:, 1:]
+    keep = ~fitted
+    norm_lo[keep], norm_hi[keep] = reg.norm_lo[keep], reg.norm_hi[keep]
+    stats = {'gram': gram, 'moment': moment, 'yy': yy, 'nobs': nobs}
+    if 'inverse_gram' in reg.arrays:
+        # Every lake's statistics were replaced; online.py derives P again from gram
+        stats['inverse_gram'] = np.full_like(reg.inverse_gram, np.nan)
+    return reg.replace(intercept=intercept, coef=coef, norm_lo=norm_lo, norm_hi=norm_hi,
+                       **stats), [str(n) for n in reg.names[fitted]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refit every lake model from annual observations")
+    parser.add_argument('observations', help="CSV or Parquet table: lake, year, Norm_CyAN and the features")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="registry to start from")
+    parser.add_argument('--output', default=registry.DEFAULT_PATH)
+    parser.add_argument('--renormalize', action='store_true',
+                        help="recompute each lake's normalization bounds from its rows")
+    parser.add_argument('--ridge', type=float, default=0.0, help="ridge penalty on the normal equations")
+    parser.add_argument('--min-rows', type=int, default=PARAMETERS,
+                        help="lakes with fewer rows keep their coefficients")
+    args = parser.parse_args(argv)
+
+    reg = registry.load(args.registry)
+    new, fitted = refit(reg, read_table(args.observations), args.renormalize, args.ridge, args.min_rows)
+    skipped = len(reg) - len(fitted)
+    if skipped:
+        print(f"{skipped} lakes had fewer than {args.min_rows} usable rows and were not refitted",
+              file=sys.stderr)
+    new.save(args.output)
+    print(f"refitted {len(fitted)} lakes into {args.output} (version {new.version})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Memory-mapped store of daily CyAN values for every lake.
+
+A store is a directory with ``meta.json`` (lakes, first day, days written and
+capacity) and ``values.f32``, a lake-major float32 matrix memory-mapped as
+``(lakes, capacity)``: each lake's days are one contiguous row, so a lake and
+date range is a slice of the map (no copy, no CSV parsing, no DataFrame).
+Day ``d`` lives at column ``d - start``; days without data are NaN. When an
+append runs past the capacity the file is rewritten with the capacity
+doubled, so appends are amortized O(1); a write before the first day moves
+``start`` back the same way, rewriting the file with the days shifted. An
+import also brings the store's min/max pyramid (downsample.py) and bloom
+events (events.py) up to date, so the app only ever reads the store. Usage::
+
+    python history.py import daily.csv [--store history/]   # lake,date,value rows
+    python history.py show Yale [--start 2020-01-01] [--end 2020-12-31]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+import registry
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history')
+FORMAT = 1
+INITIAL_CAPACITY = 366
+LOG_SIZE = 256   # writes remembered for readers catching up (see changed_since)
+
+
+def _day(value):
+    return np.datetime64(value, 'D')
+
+
+class Store:
+    """Daily values per lake, memory-mapped from ``path``."""
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        self.mode = mode
+        self._stamp = None
+        self.refresh()
+
+    @classmethod
+    def create(cls, path, lakes, start, capacity=INITIAL_CAPACITY):
+        os.makedirs(path, exist_ok=True)
+        meta = {'format': FORMAT, 'lakes': [str(lake) for lake in lakes],
+                'start': str(_day(start)), 'days': 0, 'capacity': int(capacity)}
+        np.full((len(meta['lakes']), meta['capacity']), np.nan, dtype=np.float32).tofile(
+            os.path.join(path, 'values.f32'))
+        cls._write_meta(path, meta)
+        return cls(path, mode='r+')
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def refresh(self):
+        """Re-open the map if another process grew or extended the store."""
+        stamp = os.stat(os.path.join(self.path, 'meta.json')).st_mtime_ns
+        if stamp == self._stamp:
+            return self
+        with open(os.path.join(self.path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT:
+            raise ValueError(f"{self.path} is not a format {FORMAT} history store")
+        self.lakes = meta['lakes']
+        self.start = _day(meta['start'])
+        self.days = meta['days']
+        self.capacity = meta['capacity']
+        self.revision = meta.get('revision', 0)
+        self.log = meta.get('log', [])   # [revision, first column written], oldest first
+        self._index = {lake: i for i, lake in enumerate(self.lakes)}
+        self.values = np.memmap(os.path.join(self.path, 'values.f32'), dtype=np.float32, mode=self.mode,
+                                shape=(len(self.lakes), self.capacity))
+        self._stamp = stamp
+        return self
+
+    def changed_since(self, revision):
+        """First column written after ``revision``, or None when nothing was.
+
+        Readers that fall further behind than the log reaches get 0.
+        """
+        if revision >= self.revision:
+            return None
+        columns = [first for rev, first in self.log if rev > revision]
+        if not self.log or self.log[0][0] > revision + 1:
+            return 0
+        return min(columns)
+
+    def __contains__(self, lake):
+        return lake in self._index
+
+    @property
+    def end(self):
+        """Day after the last day written."""
+        return self.start + np.timedelta64(self.days, 'D')
+
+    def _column(self, day):
+        return int((_day(day) - self.start) // np.timedelta64(1, 'D'))
+
+    def series(self, lake, start=None, end=None):
+        """``(days, values)`` of ``lake`` for ``start <= day < end`` (a view of the map)."""
+        row = self.values[self._index[lake]]
+        first = 0 if start is None else min(max(self._column(start), 0), self.days)
+        last = self.days if end is None else min(max(self._column(end), first), self.days)
+        return self.start + np.arange(first, last), row[first:last]
+
+    def _grow(self, days, before=0):
+        """Make room for ``days`` columns, the current ones moved ``before`` columns later."""
+        capacity = self.capacity if days <= self.capacity else max(days, 2 * self.capacity)
+        tmp = os.path.join(self.path, 'values.f32.tmp')
+        grown = np.memmap(tmp, dtype=np.float32, mode='w+', shape=(len(self.lakes), capacity))
+        grown[:, :before] = np.nan
+        grown[:, before:before + self.days] = self.values[:, :self.days]
+        grown[:, before + self.days:] = np.nan
+        grown.flush()
+        del grown
+        self.values = None
+        os.replace(tmp, os.path.join(self.path, 'values.f32'))
+        self.capacity = capacity
+        self.values = np.memmap(os.path.join(self.path, 'values.f32'), dtype=np.float32, mode=self.mode,
+                                shape=(len(self.lakes), capacity))
+
+    def write(self, start, block, lakes=None):
+        """Write ``block`` (``(lakes, days)``) from day ``start`` on.
+
+        ``lakes`` names the block's rows (default: every lake, in store order).
+        Days past the current end extend the store; days before its first day
+        move ``start`` back.
+        """
+        if self.mode == 'r':
+            raise ValueError("store is open read-only")
+        block = np.asarray(block, dtype=np.float32)
+        first = self._column(start)
+        before = max(-first, 0)
+        first, last = first + before, first + before + block.shape[1]
+        if before or last > self.capacity:
+            self._grow(max(last, self.days + before), before)
+            self.start -= np.timedelta64(before, 'D')
+            self.days += before
+        rows = slice(None) if lakes is None else [self._index[lake] for lake in lakes]
+        self.values[rows, first:last] = block
+        self.values.flush()
+        self.days = max(self.days, last)
+        self.revision += 1
+        self.log = (self.log + [[self.revision, first]])[-LOG_SIZE:]
+        self._write_meta(self.path, {'format': FORMAT, 'lakes': self.lakes, 'start': str(self.start),
+                                     'days': self.days, 'capacity': self.capacity,
+                                     'revision': self.revision, 'log': self.log})
+        self._stamp = os.stat(os.path.join(self.path, 'meta.json')).st_mtime_ns
+
+    def append(self, day, values):
+        """Write one day's value for every lake (NaN where unobserved)."""
+        self.write(day, np.asarray(values, dtype=np.float32)[:, None])
+
+
+def load(path=DEFAULT_PATH):
+    """The store at ``path`` opened read-only, or None when there is none."""
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    return Store(path)
+
+
+def import_csv(path, store_path, lakes):
+    """Load ``lake,date,value`` rows into a store (created when missing)."""
+    rows = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['value'].strip():
+                rows.setdefault(row['lake'].strip(), []).append((_day(row['date'].strip()), float(row['value'])))
+    if not rows:
+        return None
+    if os.path.exists(os.path.join(store_path, 'meta.json')):
+        store = Store(store_path, mode='r+')
+    else:
+        store = Store.create(store_path, lakes, min(day for series in rows.values() for day, _ in series))
+    unknown = []
+    for lake, series in rows.items():
+        if lake not in store:
+            unknown.append(lake)
+            continue
+        days = np.array([day for day, _ in series])
+        first, last = days.min(), days.max() + 1
+        # Keep what the store already has between the new rows
+        block = np.full(int((last - first) // np.timedelta64(1, 'D')), np.nan, dtype=np.float32)
+        existing_days, existing = store.series(lake, first, last)
+        block[((existing_days - first) // np.timedelta64(1, 'D')).astype(np.intp)] = existing
+        block[((days - first) // np.timedelta64(1, 'D')).astype(np.intp)] = [value for _, value in series]
+        store.write(first, block[None], lakes=[lake])
+    return store, unknown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily CyAN history store")
+    parser.add_argument('--store', default=DEFAULT_PATH, help="store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_csv = commands.add_parser('import', help="add lake,date,value rows")
+    load_csv.add_argument('csv')
+    load_csv.add_argument('--registry', default=registry.DEFAULT_PATH, help="lakes of a new store")
+    show = commands.add_parser('show', help="print one lake's values")
+    show.add_argument('lake')
+    show.add_argument('--start')
+    show.add_argument('--end')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        result = import_csv(args.csv, args.store, [str(n) for n in registry.load(args.registry).names])
+        if result is None:
+            raise SystemExit(f"no values in {args.csv}")
+        store, unknown = result
+        if unknown:
+            print(f"not in the store: {', '.join(unknown)}", file=sys.stderr)
+        print(f"{args.store}: {len(store.lakes)} lakes, {store.start} to {store.end - 1}")
+        # Both import this module, so they are loaded only here
+        import downsample
+        import events
+        downsample.Pyramid.load(store, rebuild=True)
+        detector = events.update(store)
+        print(f"rebuilt the history views; {len(detector.event_lake)} bloom events on record")
+        return
+
+    store = load(args.store)
+    if store is None or args.lake not in store:
+        raise SystemExit(f"no history for {args.lake}")
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['date', 'value'])
+    for day, value in zip(*store.series(args.lake, args.start, args.end)):
+        writer.writerow([day, '' if np.isnan(value) else float(value)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Watershed membership of the lakes and scenario propagation across them.
+
+The HUC10/HUC12 land-use (and nutrient) inputs describe the watershed that
+encloses a lake, so a change in one watershed affects every lake inside it.
+``hucs.csv`` lists each lake's watersheds (columns ``lake,huc10,huc12``, blank
+when unknown). Without it, the membership is inferred from the registry:
+lakes whose 2022 HUC10 (or HUC12) inputs are all identical are taken to share
+that watershed, under a synthetic code such as ``HUC10-007``.
+
+For each level the index keeps the sparse lake x HUC incidence both ways: a
+lake -> HUC column (-1 when unknown) and a HUC -> lakes CSR list. Propagating
+a change is one incidence product, ``(lakes x HUCs) @ (HUCs x features)``,
+which for a one-HUC-per-lake incidence is a gather. Usage::
+
+    python huc.py infer [--output hucs.csv]
+    python huc.py apply HUC10_cropland_area_1 +5 --lake Yale   # Yale's HUC10
+    python huc.py apply HUC12_developed_area_5 -2 --huc HUC12-014
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import registry
+import scoring
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hucs.csv')
+LEVELS = ('HUC10', 'HUC12')
+
+Propagation = namedtuple('Propagation', 'affected values magnitude percentage_change')
+
+
+def level_of(feature):
+    """Watershed level (``'HUC10'`` or ``'HUC12'``) a feature is measured over."""
+    level = feature.split('_', 1)[0]
+    if level not in LEVELS:
+        raise ValueError(f"{feature!r} is not a watershed feature")
+    return level
+
+
+class HucIndex:
+    """Lake x HUC incidence for both watershed levels.
+
+    ``membership`` maps each level to one HUC code (or None) per lake of
+    ``names``, in that order.
+    """
+
+    def __init__(self, names, membership):
+        self.names = [str(name) for name in names]
+        self._position = {name: k for k, name in enumerate(self.names)}
+        self.codes, self.member, self.indptr, self.lakes = {}, {}, {}, {}
+        for level in LEVELS:
+            column = membership.get(level, [None] * len(self.names))
+            codes = sorted({c for c in column if c})
+            lookup = {c: h for h, c in enumerate(codes)}
+            member = np.array([lookup[c] if c else -1 for c in column], dtype=np.intp)
+            known = np.flatnonzero(member >= 0)
+            order = known[np.argsort(member[known], kind='stable')]
+            self.codes[level] = codes
+            self.member[level] = member
+            self.indptr[level] = np.concatenate(([0], np.cumsum(np.bincount(member[known], minlength=len(codes)))))
+            self.lakes[level] = order
+
+    @classmethod
+    def from_csv(cls, path, reg):
+        rows = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows[row['lake'].strip()] = row
+        names = [str(name) for name in reg.names]
+        return cls(names, {level: [(rows.get(name, {}).get(level.lower()) or '').strip() or None for name in names]
+                           for level in LEVELS})
+
+    @classmethod
+    def infer(cls, reg):
+        """Group lakes whose 2022 inputs at a level are identical."""
+        names = [str(name) for name in reg.names]
+        membership = {}
+        for level in LEVELS:
+            keys = []
+            for i, name in enumerate(names):
+                keys.append(tuple((f, round(float(reg.baseline[i, j]), 6))
+                                  for j, f in enumerate(reg.features(name)) if f.startswith(level)))
+            groups = {}
+            for key in keys:
+                groups.setdefault(key, f"{level}-{len(groups) + 1:03d}")
+            membership[level] = [groups[key] if key else None for key in keys]
+        return cls(names, membership)
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['lake', *[level.lower() for level in LEVELS]])
+            for name in self.names:
+                writer.writerow([name, *[self.huc_of(name, level) or '' for level in LEVELS]])
+
+    def huc_of(self, lake, level):
+        h = self.member[level][self._position[lake]]
+        return self.codes[level][h] if h >= 0 else None
+
+    def lakes_in(self, level, code):
+        """Names of the lakes inside one HUC."""
+        h = self.codes[level].index(code)
+        members = self.lakes[level][self.indptr[level][h]:self.indptr[level][h + 1]]
+        return [self.names[k] for k in members]
+
+    def neighbours(self, lake):
+        """Other lakes sharing the HUC10 or the HUC12 of ``lake``."""
+        shared = []
+        for level in LEVELS:
+            code = self.huc_of(lake, level)
+            if code:
+                shared.extend(n for n in self.lakes_in(level, code) if n != lake and n not in shared)
+        return shared
+
+    def deltas(self, changes, features):
+        """Per-lake input deltas, ``(lakes, features)``, for ``{(feature, huc): delta}``."""
+        column = {f: j for j, f in enumerate(features)}
+        per_huc = {level: np.zeros((len(self.codes[level]), len(features))) for level in LEVELS}
+        for (feature, code), delta in changes.items():
+            level = level_of(feature)
+            per_huc[level][self.codes[level].index(code), column[feature]] += delta
+        result = np.zeros((len(self.names), len(features)))
+        for level in LEVELS:
+            member = self.member[level]
+            known = member >= 0
+            result[known] += per_huc[level][member[known]]
+        return result
+
+    def propagate(self, scorer, changes, start=None):
+        """Apply watershed changes to every lake of ``scorer`` and rescore.
+
+        ``changes`` maps ``(feature, huc_code)`` to a delta in slider units.
+        ``start`` is the ``(lakes, features)`` starting point, by default the
+        2022 baselines. A lake only moves on features its model uses.
+        """
+        rows = np.array([self._position[str(name)] for name in scorer.names], dtype=np.intp)
+        delta = self.deltas(changes, scorer.features)[rows] * (scorer.weights.T != 0)
+        values = np.array(scorer.baseline if start is None else start, dtype=np.float64) + delta
+        magnitude = scorer.offset + (scorer.weights.T * values).sum(axis=1)
+        return Propagation(
+            affected=(delta != 0).any(axis=1),
+            values=values,
+            magnitude=magnitude,
+            percentage_change=scorer.percentage_change(magnitude),
+        )
+
+
+def load(reg, path=DEFAULT_PATH):
+    """The membership table at ``path`` when present, else the inferred one."""
+    if path and os.path.exists(path):
+        return HucIndex.from_csv(path, reg)
+    return HucIndex.infer(reg)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watershed membership and scenario propagation")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    parser.add_argument('--membership', default=DEFAULT_PATH, help="lake,huc10,huc12 table")
+    commands = parser.add_subparsers(dest='command', required=True)
+    infer = commands.add_parser('infer', help="write the membership inferred from the registry")
+    infer.add_argument('--output', default=DEFAULT_PATH)
+    apply = commands.add_parser('apply', help="change one watershed input and rescore every lake in it")
+    apply.add_argument('feature', choices=[f for f in scoring.ALL_FEATURES if f.startswith(LEVELS)])
+    apply.add_argument('delta', type=float, help="change in slider units (percent points, or mg/L)")
+    where = apply.add_mutually_exclusive_group(required=True)
+    where.add_argument('--huc', help="HUC code")
+    where.add_argument('--lake', help="use the watershed enclosing this lake")
+    args = parser.parse_args(argv)
+
+    reg = registry.load(args.registry)
+    if args.command == 'infer':
+        index = HucIndex.infer(reg)
+        index.to_csv(args.output)
+        print(f"wrote {sum(len(c) for c in index.codes.values())} inferred HUCs to {args.output}")
+        return
+
+    index = load(reg, args.membership)
+    level = level_of(args.feature)
+    code = args.huc or index.huc_of(args.lake, level)
+    if code not in index.codes[level]:
+        raise SystemExit(f"no {level} known for {args.huc or args.lake}")
+    scorer = scoring.Scorer(reg, index.lakes_in(level, code), features=scoring.ALL_FEATURES)
+    result = index.propagate(scorer, {(args.feature, code): args.delta})
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['lake', 'huc', 'magnitude', 'percentage_change'])
+    for k in np.flatnonzero(result.affected):
+        writer.writerow([scorer.names[k], code, result.magnitude[k], result.percentage_change[k]])
+
+
+if __name__ == '__main__':
+    main()
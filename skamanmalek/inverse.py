@@ -0,0 +1,160 @@
+"""Inverse planning: the smallest input change that reaches a target magnitude.
+
+For each lake the model is affine, ``magnitude = offset + w . x``, so hitting
+a target is one linear equality over the slider box. Changes are measured in
+fractions of each slider's range and weighted by ``cost``:
+
+* ``norm='l2'`` minimizes ``sum(cost * (dx / range) ** 2)`` (a QP). Its KKT
+  solution is ``x = clip(x0 + lambda * w_scaled / cost)``, and the single
+  multiplier per lake is found by a vectorized bisection.
+* ``norm='l1'`` minimizes ``sum(cost * |dx| / range)`` (an LP). The optimum
+  moves the most effective features first (largest ``|w| / cost``) until the
+  target is met, which vectorizes as a sort plus a cumulative sum.
+
+Both solve every lake at once. Climate features are held fixed by default;
+only the land-use / nutrient levers move. Usage::
+
+    python inverse.py --change -20 [--lake Yale ...] [--norm l1] [--output plan.csv]
+    python inverse.py --target 40 --lake Yale
+"""
+import argparse
+import csv
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import registry
+import scoring
+
+CLIMATE = ('AVFST_Max', 'ARAIN_Average')
+
+Plan = namedtuple('Plan', 'values magnitude feasible')
+
+
+def target_from_change(scorer, percentage_change):
+    """Target magnitudes for a % change against each lake's 2022 baseline."""
+    return scorer.norm_cyan * (1 + np.asarray(percentage_change, dtype=np.float64) / 100)
+
+
+def solve(scorer, target, start=None, adjustable=None, cost=None, norm='l2', iterations=100):
+    """Minimum-change inputs for every lake of ``scorer``.
+
+    ``target`` is one magnitude per lake (or a scalar). ``start`` is the
+    ``(lakes, features)`` starting point, by default the 2022 baselines.
+    ``adjustable`` names the features allowed to move (default: everything
+    but climate). ``cost`` weights each feature's relative change, shaped
+    ``(features,)`` or ``(lakes, features)``. Lakes whose target lies outside
+    the reachable range get the closest reachable inputs and
+    ``feasible=False``.
+    """
+    reg = scorer.registry
+    lakes, features = len(scorer.names), len(scorer.features)
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), (lakes,))
+    x0 = np.array(scorer.baseline if start is None else start, dtype=np.float64)
+    if adjustable is None:
+        adjustable = [f for f in scorer.features if f not in CLIMATE]
+    movable = np.array([f in adjustable for f in scorer.features])
+    cost = np.broadcast_to(np.asarray(1.0 if cost is None else cost, dtype=np.float64), (lakes, features))
+
+    # Slider bounds in the scorer's feature-column layout
+    lo, hi = x0.copy(), x0.copy()
+    for k, i in enumerate(scorer.index):
+        for j, f in enumerate(reg.features(str(reg.names[i]))):
+            column = scorer.features.index(f)
+            lo[k, column], hi[k, column] = reg.slider_lo[i, j], reg.slider_hi[i, j]
+    span = np.where(hi > lo, hi - lo, 1.0)
+    fixed = ~movable | (scorer.weights.T == 0) | (cost <= 0)
+    lo = np.where(fixed, x0, np.minimum(lo, x0))
+    hi = np.where(fixed, x0, np.maximum(hi, x0))
+
+    # Reachable range and the change the target needs
+    w = scorer.weights.T
+    reach_lo = scorer.offset + np.minimum(w * lo, w * hi).sum(axis=1)
+    reach_hi = scorer.offset + np.maximum(w * lo, w * hi).sum(axis=1)
+    feasible = (target >= reach_lo - 1e-9) & (target <= reach_hi + 1e-9)
+    goal = np.clip(target, reach_lo, reach_hi)
+
+    if norm == 'l2':
+        values = _solve_l2(w, x0, lo, hi, span, cost, fixed, goal - scorer.offset, iterations)
+    elif norm == 'l1':
+        values = _solve_l1(w, x0, lo, hi, span, cost, fixed, goal - scorer.offset)
+    else:
+        raise ValueError(f"norm must be 'l1' or 'l2', not {norm!r}")
+    return Plan(values, scorer.offset + (w * values).sum(axis=1), feasible)
+
+
+def _solve_l2(w, x0, lo, hi, span, cost, fixed, goal, iterations):
+    # x_j(lam) = clip(x0_j + lam * w_j * span_j**2 / cost_j); w . x(lam) is nondecreasing in lam
+    step = np.where(fixed, 0.0, w * span ** 2 / np.where(cost > 0, cost, 1.0))
+
+    def at(lam):
+        return np.clip(x0 + lam[:, None] * step, lo, hi)
+
+    # Bracket: beyond the largest saturation point every feature sits on a bound
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturate = np.where(step != 0, np.maximum(np.abs((hi - x0) / step), np.abs((lo - x0) / step)), 0)
+    bound = saturate.max(axis=1) + 1.0
+    left, right = -bound, bound.copy()
+    for _ in range(iterations):
+        middle = (left + right) / 2
+        below = (w * at(middle)).sum(axis=1) < goal
+        left = np.where(below, middle, left)
+        right = np.where(below, right, middle)
+    return at((left + right) / 2)
+
+
+def _solve_l1(w, x0, lo, hi, span, cost, fixed, goal):
+    need = goal - (w * x0).sum(axis=1)
+    direction = np.sign(need)[:, None]
+    # Room to move each feature in the helpful direction, in magnitude units
+    toward_hi = np.where(direction * w > 0, hi - x0, 0.0)
+    toward_lo = np.where(direction * w < 0, x0 - lo, 0.0)
+    room = np.abs(w) * (toward_hi + toward_lo)
+    efficiency = np.where(fixed, -np.inf, np.abs(w) * span / np.where(cost > 0, cost, 1.0))
+
+    order = np.argsort(-efficiency, axis=1)
+    rows = np.arange(len(w))[:, None]
+    room_sorted = room[rows, order]
+    before = np.cumsum(room_sorted, axis=1) - room_sorted
+    used_sorted = np.clip(np.abs(need)[:, None] - before, 0.0, room_sorted)
+    used = np.empty_like(used_sorted)
+    used[rows, order] = used_sorted
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        move = np.where(w != 0, used / np.abs(w), 0.0)
+    return x0 + move * np.sign(w) * direction
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minimum input changes to reach a bloom target")
+    goal = parser.add_mutually_exclusive_group(required=True)
+    goal.add_argument('--change', type=float, help="target %% change against the 2022 baseline")
+    goal.add_argument('--target', type=float, help="target bloom magnitude")
+    parser.add_argument('--lake', nargs='*', help="lakes to plan (default: all)")
+    parser.add_argument('--norm', choices=('l1', 'l2'), default='l2')
+    parser.add_argument('--adjust', nargs='*', help="features allowed to move (default: all but climate)")
+    parser.add_argument('--output', help="CSV file (default: stdout)")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    scorer = scoring.Scorer(registry.load(args.registry), args.lake or None)
+    target = target_from_change(scorer, args.change) if args.change is not None else args.target
+    plan = solve(scorer, target, adjustable=args.adjust, norm=args.norm)
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(['lake', 'feasible', 'target', 'magnitude',
+                         *[f"{f}_baseline" for f in scorer.features], *scorer.features])
+        targets = np.broadcast_to(target, plan.magnitude.shape)
+        for k, name in enumerate(scorer.names):
+            writer.writerow([name, bool(plan.feasible[k]), targets[k], plan.magnitude[k],
+                             *scorer.baseline[k], *plan.values[k]])
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import json
+
+import numpy as np
+import streamlit as st
+
+import bootstrap
+import downsample
+import events
+import huc
+import prediction_cache
+import scoring
+import uncertainty
+from schema import FEATURE_WIDGETS
+
+# Most points a history chart sends; longer ranges come from the min/max pyramid
+HISTORY_POINTS = 1000
+
+
+def _bloom_events(history, lake):
+    """Summarize the lake's recorded bloom events, as of the last ``events.py`` run."""
+    detector = events.load(history)
+    if detector is None:
+        return
+    summary = detector.summary(history._index[lake], detector.through)
+    if detector.through < history.days:
+        st.caption(f"Bloom events as of {history.start + detector.through - 1}; "
+                   f"run `python events.py` to include the later days.")
+    if not summary.events and summary.ongoing_since is None:
+        st.write("**Bloom Events on Record:** none")
+        return
+    if summary.events:
+        st.write(f"**Bloom Events on Record:** {summary.events} ({summary.per_year:.1f} per year), "
+                 f"lasting {summary.mean_duration:.1f} days on average")
+        st.write(f"**Last Bloom Event:** began {history.start + summary.last_onset}, "
+                 f"lasted {summary.last_duration} days, peak {summary.last_peak:.4f}")
+    if summary.ongoing_since is not None:
+        st.warning(f"**A bloom has been in progress since {history.start + summary.ongoing_since}.**")
+
+
+def render(reg, lake, hucs=None, history=None):
+    """Draw one lake's estimator, the same page each lake script builds.
+
+    With a :class:`huc.HucIndex`, the page also shows how its watershed
+    inputs carry over to the other lakes in the same HUC10/HUC12; with a
+    :class:`history.Store`, the lake's daily CyAN history.
+    """
+    i = reg.index(lake)
+    title = reg.titles[i]
+
+    # Display the title with blue color and centered text
+    title_markdown = f"<h1 style='color: blue; text-align: center;'>Future Cyanobacteria Bloom Magnitude Estimation in {title}</h1>"
+    st.markdown(title_markdown, unsafe_allow_html=True)
+
+    # Sidebar for user inputs with icons
+    st.sidebar.markdown("<h2 style='font-size: 24px;'>🛠️ User Inputs:</h2>", unsafe_allow_html=True)
+    st.sidebar.write(f"The default values represent mean annual measurements derived from the 2022 baseline for {title}.")
+
+    # User Input in the sidebar, one slider per model feature
+    user_values = []
+    for j, feature in enumerate(reg.features(lake)):
+        label, key, help_text = FEATURE_WIDGETS[feature]
+        user_values.append(st.sidebar.slider(
+            label, float(reg.slider_lo[i, j]), float(reg.slider_hi[i, j]), float(reg.baseline[i, j]),
+            step=0.1, key=f"{lake}_{key}", help=help_text))
+
+    # Calculate Predicted Magnitude (shared across sessions for repeated slider values)
+    prediction = prediction_cache.predict(reg, lake, user_values)
+    initial_magnitude = float(reg.norm_cyan[i])
+    final_bloom_magnitude = prediction.magnitude
+    percentage_change = prediction.percentage_change
+
+    # Main content to display the output with an icon
+    st.header("📈 Model Output")
+
+    # Display the final result with bold text
+    st.write(f"**Initial Cyanobacteria Bloom Magnitude with the Baseline of 2022:** {initial_magnitude:.4f}")
+    st.write(f"**Predicted Cyanobacteria Bloom Magnitude:** {final_bloom_magnitude:.4f}")
+    bounds = bootstrap.interval(reg, lake, user_values)
+    if bounds is not None:
+        st.write(f"**{float(reg.interval_level) * 100:.0f}% Bootstrap Interval:** {bounds[0]:.4f} to {bounds[1]:.4f}")
+    if history is not None and lake in history.refresh() and history.days:
+        _bloom_events(history, lake)
+
+    # Display the percentage change with bold text
+    st.write(f"**Percentage Change:** {percentage_change:.2f}%")
+
+    # Display a message based on the change with color and bold text
+    threshold = 0.001
+
+    if abs(percentage_change) < threshold:
+        st.info("**The estimated bloom magnitude remains the same.**")
+    elif percentage_change > 0:
+        st.error("**The annual magnitude of cyanobacteria bloom is predicted to increase.**")
+    else:
+        st.success("**The annual magnitude of cyanobacteria bloom is predicted to decrease.**")
+
+    # Display the bar chart (Streamlit edits the spec it is given, so hand it a fresh copy)
+    st.vega_lite_chart(json.loads(prediction.chart), width="stretch")
+
+    # Optional Monte Carlo spread around the chosen values
+    with st.expander("🎲 Prediction Uncertainty"):
+        input_spread = st.slider("Input spread (% of each slider range)", 0.0, 20.0, 5.0, step=0.5,
+                                 key=f"{lake}_mc_input", help="Standard deviation of the simulated inputs.")
+        coef_cov = None
+        if bounds is not None and st.checkbox("Draw coefficients from the bootstrap covariance",
+                                              key=f"{lake}_mc_bootstrap"):
+            coef_cov = reg.coef_cov[i]
+        coef_spread = st.slider("Coefficient spread (% of each coefficient)", 0.0, 50.0, 0.0, step=1.0,
+                                key=f"{lake}_mc_coef", disabled=coef_cov is not None,
+                                help="Standard deviation of the simulated coefficients.")
+        if st.toggle("Simulate 100,000 scenarios", key=f"{lake}_mc_run"):
+            result = uncertainty.simulate(
+                reg, lake, user_values,
+                input_sd=input_spread / 100 * (reg.slider_hi[i] - reg.slider_lo[i]),
+                coef_sd=coef_spread / 100, coef_cov=coef_cov, seed=0)
+            low, high = result.interval
+            st.write(f"**95% Prediction Interval:** {low:.4f} to {high:.4f}")
+            st.write(f"**Probability of Exceeding the 2022 Baseline:** {result.exceedance['baseline'] * 100:.1f}%")
+
+    # Smallest land-use change, from the chosen values, that reaches a target
+    with st.expander("🎯 Target Planner"):
+        target_change = st.slider("Target change from the 2022 baseline (%)", -100.0, 100.0, -20.0, step=1.0,
+                                  key=f"{lake}_plan_target")
+        norm = st.radio("Spread the change", ("across all inputs", "over the fewest inputs"),
+                        key=f"{lake}_plan_norm", horizontal=True,
+                        help="Least squares spreads the change; least absolute change concentrates it.")
+        if st.toggle("Plan the inputs", key=f"{lake}_plan_run"):
+            plan = prediction_cache.plan(reg, lake, user_values, target_change,
+                                         'l2' if norm == "across all inputs" else 'l1')
+            if not plan.feasible[0]:
+                st.warning("**The target cannot be reached within the slider ranges; showing the closest inputs.**")
+            st.write(f"**Planned Cyanobacteria Bloom Magnitude:** {plan.magnitude[0]:.4f}")
+            for feature, before, after in zip(reg.features(lake), user_values, plan.values[0]):
+                if abs(after - before) >= 0.05:
+                    st.write(f"{FEATURE_WIDGETS[feature][0]}: {before:.1f} → {after:.1f} ({after - before:+.1f})")
+
+    # Watershed inputs are shared: carry this lake's changes over to its neighbours
+    neighbours = hucs.neighbours(lake) if hucs is not None else []
+    if neighbours:
+        with st.expander("🗺️ Shared Watershed"):
+            changes = {}
+            for feature, value, base in zip(reg.features(lake), user_values, reg.baseline[i]):
+                code = hucs.huc_of(lake, feature.split('_', 1)[0]) if feature.startswith(huc.LEVELS) else None
+                if code and abs(value - base) > 1e-9:
+                    changes[feature, code] = value - base
+            if not changes:
+                st.write(f"Move a HUC10/HUC12 slider to see its effect on the {len(neighbours)} lakes "
+                         f"sharing a watershed with {title}.")
+            else:
+                scorer = scoring.Scorer(reg, neighbours, features=scoring.ALL_FEATURES)
+                result = hucs.propagate(scorer, changes)
+                for k in np.flatnonzero(result.affected):
+                    st.write(f"**{reg.titles[scorer.index[k]]}:** {result.magnitude[k]:.4f} "
+                             f"({result.percentage_change[k]:+.2f}%)")
+
+    # Daily CyAN record behind the 2022 baseline; zooming in reads finer pyramid levels
+    if history is not None and lake in history.refresh() and history.days:
+        with st.expander("📅 Bloom History"):
+            first, last = history.start.item(), (history.end - 1).item()
+            start, end = st.slider("Dates", first, last, (first, last), key=f"{lake}_history_range")
+            end = np.datetime64(end) + 1
+            pyramid = downsample.Pyramid.load(history)
+            if pyramid is None:
+                view = downsample.lttb_view(history, lake, start, end, HISTORY_POINTS)
+            else:
+                view = pyramid.view(lake, start, end, HISTORY_POINTS)
+            if pyramid is None or pyramid.stale:
+                st.info("The history summaries are older than the daily record; "
+                        "run `python history.py import` or `python downsample.py build` to refresh them.")
+            st.vega_lite_chart(downsample.chart(view), width="stretch")
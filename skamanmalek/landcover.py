@@ -0,0 +1,168 @@
+"""Land-cover fractions of every HUC10/HUC12 from a land-cover raster.
+
+Reads a land-cover raster together with HUC10 and HUC12 label rasters on the
+same grid, splits it into strips of rows ("tiles") and hands the tiles to a
+process pool. Each worker maps the raw class codes to the four model
+categories with a lookup table and counts pixels per (HUC, category) with one
+``bincount`` per strip; the per-tile counts are summed, so the whole state is
+covered in one pass. Fractions are percentages of the HUC's mapped pixels
+(no-data pixels excluded), as in the ``HUC10_cropland_area_1`` & co. inputs.
+
+Class codes: by default the model's own coding (1 cropland, 3 grassland and
+pasture, 4 forest and shrubland, 5 developed, any other code is other land,
+0 no data); ``--classes nlcd`` maps NLCD codes instead. Usage::
+
+    python landcover.py landcover.tif --huc10 huc10.tif --huc10-zones huc10.csv \\
+        --huc12 huc12.tif --huc12-zones huc12.csv [--classes nlcd] [--jobs 4] \\
+        [--output landcover.csv] [--update-registry]
+
+The zone CSVs (``zone,huc``) name the HUC behind each label value. With
+``--update-registry`` each lake's land-use baselines are taken from its
+HUC10/HUC12 in the membership table (``hucs.csv``, see huc.py).
+"""
+import argparse
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import huc
+import registry
+import zonal
+
+CATEGORIES = ('cropland', 'grassland_pasture', 'forest_shrubland', 'developed')
+OTHER, NO_DATA = len(CATEGORIES), -1
+
+# Registry feature filled from each (level, category)
+FEATURES = {
+    'HUC10_cropland_area_1': ('HUC10', 'cropland'),
+    'HUC10_grassland_and_pasture_3': ('HUC10', 'grassland_pasture'),
+    'HUC12_forest_and_shrubland_4': ('HUC12', 'forest_shrubland'),
+    'HUC12_developed_area_5': ('HUC12', 'developed'),
+}
+
+CLASS_CODES = {
+    'model': {'cropland': (1,), 'grassland_pasture': (3,), 'forest_shrubland': (4,), 'developed': (5,)},
+    'nlcd': {'cropland': (82,), 'grassland_pasture': (71, 81), 'forest_shrubland': (41, 42, 43, 52),
+             'developed': (21, 22, 23, 24)},
+}
+NO_DATA_CODES = {'model': (0,), 'nlcd': (0, 250)}
+
+
+def lookup_table(scheme, size=256):
+    """Raw class code -> category index (``OTHER`` and ``NO_DATA`` included)."""
+    table = np.full(size, OTHER, dtype=np.int8)
+    for category, codes in CLASS_CODES[scheme].items():
+        table[list(codes)] = CATEGORIES.index(category)
+    table[list(NO_DATA_CODES[scheme])] = NO_DATA
+    return table
+
+
+def read_huc_zones(path):
+    """``{label value: HUC code}`` from a ``zone,huc`` CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {int(row['zone']): row['huc'].strip() for row in csv.DictReader(f)}
+
+
+def _count_tile(task):
+    landcover, levels, table, start, stop, rows = task
+    counts = {level: np.zeros((zones + 1, OTHER + 1), dtype=np.int64) for level, (_, zones) in levels.items()}
+    strips = {level: zonal.read_windows(path, rows, start, stop) for level, (path, _) in levels.items()}
+    for strip, block in zonal.read_windows(landcover, rows, start, stop):
+        classes = table[np.clip(block, 0, len(table) - 1).astype(np.intp)]
+        classes[(block < 0) | (block >= len(table))] = NO_DATA
+        for level, (_, zones) in levels.items():
+            _, labels = next(strips[level])
+            counts[level] += zonal.zone_classes(labels, classes, zones, OTHER + 1)
+    return counts
+
+
+def huc_fractions(landcover, levels, scheme='model', tile_rows=4096, rows=zonal.WINDOW_ROWS, jobs=None):
+    """Category percentages per HUC label, ``{level: (zones + 1, categories)}``.
+
+    ``levels`` maps ``'HUC10'``/``'HUC12'`` to ``(label raster path, largest
+    label)``. Labels without mapped pixels get NaN.
+    """
+    shape, _ = zonal.raster_grid(landcover)
+    height = shape[0]
+    for level, (path, _) in levels.items():
+        if zonal.raster_grid(path)[0] != shape:
+            raise ValueError(f"{level} label raster is not on the land-cover grid")
+    table = lookup_table(scheme)
+    tasks = [(landcover, levels, table, top, min(top + tile_rows, height), rows)
+             for top in range(0, height, tile_rows)]
+    if len(tasks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_count_tile, tasks))
+    else:
+        parts = [_count_tile(task) for task in tasks]
+
+    fractions = {}
+    for level in levels:
+        counts = sum(part[level] for part in parts)
+        mapped = counts.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fractions[level] = np.where(mapped > 0, counts[:, :OTHER] / mapped * 100, np.nan)
+    return fractions
+
+
+def update_registry(reg, hucs, by_huc):
+    """A new registry version with land-use baselines from ``{level: {huc: percentages}}``."""
+    baseline = reg.baseline.copy()
+    for i, name in enumerate(reg.names):
+        name = str(name)
+        for j, feature in enumerate(reg.features(name)):
+            if feature not in FEATURES:
+                continue
+            level, category = FEATURES[feature]
+            values = by_huc.get(level, {}).get(hucs.huc_of(name, level))
+            if values is not None and np.isfinite(values[CATEGORIES.index(category)]):
+                baseline[i, j] = values[CATEGORIES.index(category)]
+    return reg.replace(baseline=baseline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HUC10/HUC12 land-cover fractions from a raster")
+    parser.add_argument('landcover', help="land-cover raster (.tif or .npy)")
+    for level in ('huc10', 'huc12'):
+        parser.add_argument(f'--{level}', required=True, help=f"{level.upper()} label raster on the same grid")
+        parser.add_argument(f'--{level}-zones', required=True, help="zone,huc CSV naming the label values")
+    parser.add_argument('--classes', choices=tuple(CLASS_CODES), default='model', help="class coding")
+    parser.add_argument('--tile-rows', type=int, default=4096, help="raster rows per worker task")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', default='landcover.csv')
+    parser.add_argument('--update-registry', action='store_true', help="write the fractions into the registry")
+    parser.add_argument('--membership', default=huc.DEFAULT_PATH, help="lake,huc10,huc12 table")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    zones = {'HUC10': read_huc_zones(args.huc10_zones), 'HUC12': read_huc_zones(args.huc12_zones)}
+    levels = {'HUC10': (args.huc10, max(zones['HUC10'])), 'HUC12': (args.huc12, max(zones['HUC12']))}
+    fractions = huc_fractions(args.landcover, levels, args.classes, args.tile_rows, jobs=args.jobs)
+
+    by_huc = {}
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['level', 'huc', *CATEGORIES])
+        for level, labels in zones.items():
+            by_huc[level] = {}
+            for zone, code in sorted(labels.items()):
+                by_huc[level][code] = fractions[level][zone]
+                writer.writerow([level, code, *fractions[level][zone]])
+    print(f"wrote fractions for {sum(len(z) for z in zones.values())} HUCs to {args.output}")
+
+    if args.update_registry:
+        reg = registry.load(args.registry)
+        hucs = huc.load(reg, args.membership)
+        unknown = [n for n in map(str, reg.names)
+                   if not any(hucs.huc_of(n, level) in by_huc[level] for level in huc.LEVELS)]
+        if unknown:
+            print(f"no land-cover HUC for {len(unknown)} lakes; their baselines are unchanged", file=sys.stderr)
+        reg = update_registry(reg, hucs, by_huc)
+        reg.save(args.registry)
+        print(f"updated land-use baselines in {args.registry} (version {reg.version})")
+
+
+if __name__ == '__main__':
+    main()
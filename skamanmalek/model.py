@@ -0,0 +1,106 @@
+"""Lake bloom models as plain functions, without Streamlit.
+
+    >>> import model
+    >>> model.baseline('Yale')['Norm_CyAN']
+    61.35153103
+    >>> round(model.predict('Yale', AVFST_Max=90.0), 2)   # the rest stay at baseline
+    45.66
+
+Importing this module only touches the standard library. The compiled
+registry (and with it NumPy) is loaded the first time a lake is looked up,
+and predictions are computed with plain floats.
+"""
+from collections import namedtuple
+
+from schema import LANDUSE, NUTRIENT, SCHEMAS  # noqa: F401
+
+Lake = namedtuple('Lake', 'name title features norm_cyan baseline intercept coef '
+                          'norm_lo norm_hi slider_lo slider_hi scale version')
+
+_lakes = None
+
+
+def load(path=None):
+    """(Re)load the lake table, from ``path`` or the default ``lakes.npz``."""
+    global _lakes
+    import registry
+    reg = registry.load(path or registry.DEFAULT_PATH)
+    table = {}
+    for i, name in enumerate(reg.names.tolist()):
+        table[name] = Lake(
+            name=name,
+            title=str(reg.titles[i]),
+            features=reg.features(name),
+            norm_cyan=float(reg.norm_cyan[i]),
+            baseline=tuple(reg.baseline[i].tolist()),
+            intercept=float(reg.intercept[i]),
+            coef=tuple(reg.coef[i].tolist()),
+            norm_lo=tuple(reg.norm_lo[i].tolist()),
+            norm_hi=tuple(reg.norm_hi[i].tolist()),
+            slider_lo=tuple(reg.slider_lo[i].tolist()),
+            slider_hi=tuple(reg.slider_hi[i].tolist()),
+            scale=float(reg.scale[i]),
+            version=reg.version,
+        )
+    _lakes = table
+    return table
+
+
+def lake(name):
+    """The :class:`Lake` record for ``name`` (the script name, e.g. ``'Yale'``)."""
+    table = _lakes if _lakes is not None else load()
+    try:
+        return table[name]
+    except KeyError:
+        raise KeyError(f"unknown lake {name!r}") from None
+
+
+def lakes():
+    table = _lakes if _lakes is not None else load()
+    return list(table)
+
+
+def features(name):
+    """Feature names the lake's model takes, in slider order."""
+    return lake(name).features
+
+
+def baseline(name):
+    """The lake's 2022 ``initial_values`` dict."""
+    record = lake(name)
+    values = {'Norm_CyAN': record.norm_cyan}
+    values.update(zip(record.features, record.baseline))
+    return values
+
+
+def coefficients(name):
+    record = lake(name)
+    values = {'intercept': record.intercept}
+    values.update(zip(record.features, record.coef))
+    return values
+
+
+def slider_ranges(name):
+    """``{feature: (low, high)}`` as offered by the lake's sliders."""
+    record = lake(name)
+    return dict(zip(record.features, zip(record.slider_lo, record.slider_hi)))
+
+
+def predict(name, **features):
+    """Predicted bloom magnitude; features not given keep their 2022 baseline."""
+    record = lake(name)
+    unknown = set(features) - set(record.features)
+    if unknown:
+        raise TypeError(f"{name} has no feature(s) {', '.join(sorted(unknown))}; "
+                        f"expected {', '.join(record.features)}")
+    Y = record.intercept
+    for feature, default, coef, lo, hi in zip(record.features, record.baseline, record.coef,
+                                              record.norm_lo, record.norm_hi):
+        Y += coef * (features.get(feature, default) - lo) / (hi - lo)
+    return Y * record.scale
+
+
+def percentage_change(name, magnitude):
+    """Change of ``magnitude`` against the lake's 2022 ``Norm_CyAN``, in %."""
+    norm_cyan = lake(name).norm_cyan
+    return (magnitude - norm_cyan) / norm_cyan * 100
@@ -0,0 +1,123 @@
+"""Recursive least-squares updates of the lake models as new years arrive.
+
+Instead of refitting from every lake-year, each new row updates its lake's
+coefficients in O(features²) with the Sherman-Morrison form of recursive
+least squares::
+
+    k    = P x / (lambda + xᵀ P x)
+    beta = beta + k (y - xᵀ beta)
+    P    = (P - k xᵀ P) / lambda
+
+``P`` is the inverse of the (discounted) Gram matrix and is kept in the
+registry as ``inverse_gram`` next to the sufficient statistics written by
+fit.py (``gram``, ``moment``, ``yy``, ``nobs``), which are updated too. A lake
+with statistics but no ``P`` gets it from its Gram matrix once; a lake never
+fitted starts from its current coefficients under a diffuse prior. Rows of
+different lakes are updated together, one round per row position. Usage::
+
+    python online.py update new_years.csv [--forgetting 1.0]   # same columns as fit.py
+    python online.py refit                                      # exact solve from the statistics
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import fit
+import registry
+
+DIFFUSE = 1e6
+
+
+def _state(reg):
+    """``(P, gram, moment, yy, nobs)`` arrays, initialized where missing."""
+    lakes, p = len(reg), fit.PARAMETERS
+    arrays = reg.arrays
+    gram = arrays['gram'].copy() if 'gram' in arrays else np.zeros((lakes, p, p))
+    moment = arrays['moment'].copy() if 'moment' in arrays else np.zeros((lakes, p))
+    yy = arrays['yy'].copy() if 'yy' in arrays else np.zeros(lakes)
+    nobs = arrays['nobs'].copy() if 'nobs' in arrays else np.zeros(lakes)
+    P = arrays['inverse_gram'].copy() if 'inverse_gram' in arrays else np.full((lakes, p, p), np.nan)
+    missing = ~np.isfinite(P).all(axis=(1, 2))
+    if missing.any():
+        P[missing] = np.eye(p) * DIFFUSE
+        fitted = missing & (np.linalg.matrix_rank(gram) == p)
+        if fitted.any():
+            P[fitted] = np.linalg.inv(gram[fitted])
+    return P, gram, moment, yy, nobs
+
+
+def rls_step(P, beta, x, y, forgetting=1.0):
+    """One batched RLS update; ``P`` (L, p, p), ``beta`` (L, p), ``x`` (L, p), ``y`` (L,)."""
+    Px = np.einsum('lpq,lq->lp', P, x)
+    gain = Px / (forgetting + np.einsum('lp,lp->l', x, Px))[:, None]
+    beta = beta + gain * (y - np.einsum('lp,lp->l', x, beta))[:, None]
+    P = (P - np.einsum('lp,lq->lpq', gain, Px)) / forgetting
+    return P, beta
+
+
+def update(reg, table, forgetting=1.0):
+    """Fold new lake-year rows into the models; returns ``(new_registry, rows_used)``."""
+    index, X, y, _, _ = fit.design(reg, table)
+    P, gram, moment, yy, nobs = _state(reg)
+    beta = np.column_stack([reg.intercept, reg.coef])
+
+    # Round r holds the r-th new row of every lake that has one
+    present, starts, counts = np.unique(index, return_index=True, return_counts=True)
+    for r in range(counts.max(initial=0)):
+        lakes = present[counts > r]
+        rows = starts[counts > r] + r
+        x, target = X[rows], y[rows]
+        P[lakes], beta[lakes] = rls_step(P[lakes], beta[lakes], x, target, forgetting)
+        gram[lakes] = forgetting * gram[lakes] + np.einsum('lp,lq->lpq', x, x)
+        moment[lakes] = forgetting * moment[lakes] + x * target[:, None]
+        yy[lakes] = forgetting * yy[lakes] + target ** 2
+        nobs[lakes] += 1
+
+    return reg.replace(intercept=beta[:, 0], coef=beta[:, 1:], inverse_gram=P,
+                       gram=gram, moment=moment, yy=yy, nobs=nobs), len(y)
+
+
+def refit(reg, ridge=0.0, min_rows=fit.PARAMETERS):
+    """Exact least squares from the stored statistics, resetting ``P``."""
+    if 'gram' not in reg.arrays:
+        raise SystemExit("the registry has no fit statistics; run fit.py first")
+    P, gram, moment, yy, nobs = _state(reg)
+    fitted = nobs >= min_rows
+    beta = fit.solve(gram[fitted], moment[fitted], ridge)
+    intercept, coef = reg.intercept.copy(), reg.coef.copy()
+    intercept[fitted], coef[fitted] = beta[:, 0], beta[:, 1:]
+    regular = fitted & (np.linalg.matrix_rank(gram) == fit.PARAMETERS)
+    P[regular] = np.linalg.inv(gram[regular])
+    return reg.replace(intercept=intercept, coef=coef, inverse_gram=P)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recursive least-squares updates of the lake models")
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="registry to update")
+    parser.add_argument('--output', default=None, help="where to write (default: --registry)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    new = commands.add_parser('update', help="fold new lake-year rows into the coefficients")
+    new.add_argument('observations', help="CSV or Parquet table: lake, year, Norm_CyAN and the features")
+    new.add_argument('--forgetting', type=float, default=1.0,
+                     help="weight kept by past rows per update (1 = ordinary least squares)")
+    full = commands.add_parser('refit', help="exact refit from the stored sufficient statistics")
+    full.add_argument('--ridge', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    reg = registry.load(args.registry)
+    if args.command == 'update':
+        if not 0 < args.forgetting <= 1:
+            raise SystemExit("--forgetting must be in (0, 1]")
+        new_reg, used = update(reg, fit.read_table(args.observations), args.forgetting)
+        message = f"folded {used} rows"
+    else:
+        new_reg = refit(reg, args.ridge)
+        message = "refitted from the stored statistics"
+    output = args.output or args.registry
+    new_reg.save(output)
+    print(f"{message} into {output} (version {new_reg.version})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Process-wide LRU cache of lake predictions and their chart payloads.
+
+Every slider drag reruns the lake page. The prediction and the bar-chart spec
+only depend on the lake, the registry version and the slider values, so they
+are computed once per distinct (lake, version, rounded sliders) key and shared
+by every session served from this process. Target Planner solutions are
+kept the same way, keyed on the target and norm as well. The least recently
+used entry is dropped once ``maxsize`` entries are held.
+"""
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+import inverse
+import scoring
+
+# Slider values are rounded to this many decimals before keying
+ROUND_DIGITS = 6
+
+Prediction = namedtuple('Prediction', 'magnitude percentage_change chart')
+
+
+class LRUCache:
+    """Thread-safe mapping that holds at most ``maxsize`` entries."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # Compute outside the lock; a concurrent miss on the same key just
+        # computes the same value twice
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+CACHE = LRUCache()
+PLANS = LRUCache(maxsize=1024)
+
+
+def make_key(lake, version, values):
+    return (lake, int(version), tuple(round(float(v), ROUND_DIGITS) for v in values))
+
+
+def bar_chart(initial_magnitude, final_bloom_magnitude):
+    """Vega-Lite spec of the initial vs predicted bar chart, as JSON text."""
+    spec = {
+        'data': {'values': [
+            {'Magnitude Type': 'Initial Bloom Magnitude', 'Magnitude Value': initial_magnitude},
+            {'Magnitude Type': 'Predicted Bloom Magnitude', 'Magnitude Value': final_bloom_magnitude},
+        ]},
+        'mark': 'bar',
+        'encoding': {
+            'x': {'field': 'Magnitude Type', 'type': 'nominal', 'sort': None},
+            'y': {'field': 'Magnitude Value', 'type': 'quantitative'},
+        },
+    }
+    return json.dumps(spec)
+
+
+def predict(reg, lake, values, cache=CACHE):
+    """Cached :class:`Prediction` for ``values`` in the lake's feature order."""
+
+    def compute():
+        i = reg.index(lake)
+        normalized = (np.asarray(values, dtype=np.float64) - reg.norm_lo[i]) / (reg.norm_hi[i] - reg.norm_lo[i])
+        Y = reg.intercept[i] + reg.coef[i] @ normalized
+        initial_magnitude = float(reg.norm_cyan[i])
+        final_bloom_magnitude = float(Y * reg.scale[i])
+        percentage_change = (final_bloom_magnitude - initial_magnitude) / initial_magnitude * 100
+        return Prediction(final_bloom_magnitude, percentage_change,
+                          bar_chart(initial_magnitude, final_bloom_magnitude))
+
+    return cache.get_or_compute(make_key(lake, reg.version, values), compute)
+
+
+def plan(reg, lake, values, change, norm='l2', cache=PLANS):
+    """Cached :func:`inverse.solve` plan from ``values`` to ``change`` % off the 2022 baseline."""
+
+    def compute():
+        scorer = scoring.Scorer(reg, [lake])
+        return inverse.solve(scorer, inverse.target_from_change(scorer, change), start=[values], norm=norm)
+
+    key = make_key(lake, reg.version, values) + (round(float(change), ROUND_DIGITS), norm)
+    return cache.get_or_compute(key, compute)
@@ -0,0 +1,137 @@
+"""Compiled lake-model registry.
+
+Every lake app in this folder hard-codes the same pieces: the 2022 baseline
+(``initial_values``), the regression ``coefficients``, the ``b1..g2``
+normalization bounds, the ``b3..g4`` slider ranges and the ``194.0458755``
+denormalizer. The registry keeps all of them for every lake as aligned NumPy
+arrays in one ``lakes.npz`` file, so a single ``np.load`` replaces running
+133 Streamlit scripts. Row ``i`` of every array belongs to lake ``names[i]``.
+
+Rebuild the file from the scripts with ``python compile_registry.py``.
+"""
+import os
+
+import numpy as np
+
+from schema import LANDUSE, NUTRIENT, SCHEMAS, SCHEMA_NAMES  # noqa: F401
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lakes.npz")
+
+# Arrays every registry file carries, with their per-lake shape
+FIELDS = {
+    'names': (),          # script name, e.g. "Yale" for Yale.py
+    'titles': (),         # display name, e.g. "Lake Yale"
+    'schema': (),         # index into SCHEMA_NAMES
+    'norm_cyan': (),      # initial_values['Norm_CyAN']
+    'baseline': (6,),     # initial_values for the six features
+    'intercept': (),      # coefficients['intercept']
+    'coef': (6,),         # coefficients for the six features
+    'norm_lo': (6,),      # b1, c1, d1, e1, f1, g1
+    'norm_hi': (6,),      # b2, c2, d2, e2, f2, g2
+    'slider_lo': (6,),    # b3, c3, d3, e3, f3, g3
+    'slider_hi': (6,),    # b4, c4, d4, e4, f4, g4
+    'scale': (),          # final_bloom_magnitude = Y * scale
+}
+
+# Optional arrays written by fit.py and online.py: each lake's least-squares
+# sufficient statistics over (intercept, six normalized features)
+STATS_FIELDS = {
+    'gram': (7, 7),       # XᵀX
+    'moment': (7,),       # Xᵀy, y = Norm_CyAN / scale
+    'yy': (),             # yᵀy
+    'nobs': (),           # number of lake-years fitted
+    'inverse_gram': (7, 7),   # (XᵀX)⁻¹ carried by the recursive updates
+}
+
+# Optional arrays written by bootstrap.py (NaN for lakes without enough rows)
+BOOTSTRAP_FIELDS = {
+    'coef_cov': (7, 7),            # covariance of (intercept, *coef)
+    'residual_var': (),            # residual variance of the fit
+    'prediction_interval': (2,),   # magnitude interval at the 2022 baseline
+    'interval_level': None,        # coverage of the intervals (one scalar)
+}
+
+
+class Registry:
+    """Column-oriented table of every lake model."""
+
+    def __init__(self, arrays, version=1):
+        missing = [field for field in FIELDS if field not in arrays]
+        if missing:
+            raise ValueError(f"registry is missing fields: {', '.join(missing)}")
+        self.arrays = {key: np.asarray(value) for key, value in arrays.items()}
+        self.version = int(version)
+        for key, value in self.arrays.items():
+            setattr(self, key, value)
+        self._index = {str(name): i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files if key != 'version'}
+            version = data['version'] if 'version' in data.files else 1
+        return cls(arrays, version=version)
+
+    def save(self, path=DEFAULT_PATH):
+        np.savez(path, version=np.int64(self.version), **self.arrays)
+
+    def replace(self, bump=True, **arrays):
+        """Return a copy with some arrays swapped out (and a new version)."""
+        merged = dict(self.arrays)
+        merged.update(arrays)
+        return Registry(merged, version=self.version + 1 if bump else self.version)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def index(self, name):
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError(f"unknown lake {name!r}") from None
+
+    def shared_titles(self):
+        """Titles used by more than one lake (e.g. "Lake Loughman"); only script names tell them apart."""
+        titles, counts = np.unique(self.titles.astype(str), return_counts=True)
+        return set(titles[counts > 1].tolist())
+
+    def display_titles(self):
+        """``{name: title}`` for pickers, with "title (name, TN/TP model)" where a title is shared."""
+        shared = self.shared_titles()
+        titles = {}
+        for name, title in zip(self.names.astype(str), self.titles.astype(str)):
+            if title in shared:
+                model = ", TN/TP model" if self.features(name) == NUTRIENT else ""
+                title = f"{title} ({name}{model})"
+            titles[str(name)] = str(title)
+        return titles
+
+    def features(self, name):
+        return SCHEMAS[SCHEMA_NAMES[self.schema[self.index(name)]]]
+
+    def lakes(self, schema=None):
+        """Indices of the lakes using ``schema`` (all lakes when None)."""
+        if schema is None:
+            return np.arange(len(self))
+        return np.flatnonzero(self.schema == SCHEMA_NAMES.index(schema))
+
+    def initial_values(self, name):
+        """The lake's ``initial_values`` dict, as written in its script."""
+        i = self.index(name)
+        values = {'Norm_CyAN': float(self.norm_cyan[i])}
+        values.update(zip(self.features(name), self.baseline[i].tolist()))
+        return values
+
+    def coefficients(self, name):
+        """The lake's ``coefficients`` dict, as written in its script."""
+        i = self.index(name)
+        values = {'intercept': float(self.intercept[i])}
+        values.update(zip(self.features(name), self.coef[i].tolist()))
+        return values
+
+
+def load(path=DEFAULT_PATH):
+    return Registry.load(path)
@@ -0,0 +1,37 @@
+"""Feature schemas shared by the lake models.
+
+Kept free of third-party imports so that anything needing only the feature
+names (model.py, the batch tools) imports instantly.
+"""
+
+# Feature order follows the b..g slots of the lake scripts
+LANDUSE = (
+    'AVFST_Max',
+    'ARAIN_Average',
+    'HUC12_forest_and_shrubland_4',
+    'HUC10_grassland_and_pasture_3',
+    'HUC10_cropland_area_1',
+    'HUC12_developed_area_5',
+)
+NUTRIENT = (
+    'AVFST_Max',
+    'ARAIN_Average',
+    'HUC12_TN',
+    'HUC10_TP',
+    'HUC10_cropland_area_1',
+    'HUC12_developed_area_5',
+)
+SCHEMAS = {'landuse': LANDUSE, 'nutrient': NUTRIENT}
+SCHEMA_NAMES = tuple(SCHEMAS)
+
+# Slider label, widget key and help text for every model feature
+FEATURE_WIDGETS = {
+    'AVFST_Max': ("**🌡️ AVFST_Max_°F**", "avfst_max", "Adjust the annual maximum air temperature."),
+    'ARAIN_Average': ("**🌧️ ARAIN_Average_kg/m^2**", "arain_average", "Adjust the annual average rainfall."),
+    'HUC12_forest_and_shrubland_4': ("**🌲 HUC12_Forest_and_Shrubland_%**", "huc12_forest_shrubland", "Modify the percentage of forest and shrubland within the HUC12 watershed enclosing the lake."),
+    'HUC10_grassland_and_pasture_3': ("**🌾 HUC10_Grassland_and_Pasture_%**", "huc10_grassland_pasture", "Modify the percentage of grassland and pasture within the HUC10 watershed enclosing the lake."),
+    'HUC10_cropland_area_1': ("**🌱 HUC10_Cropland_Area_%**", "huc10_cropland", "Modify the percentage of cropland within the HUC10 watershed enclosing the lake."),
+    'HUC12_developed_area_5': ("**🏡 HUC12_Developed_Area_%**", "huc12_developed", "Modify the percentage of developed area within the HUC12 watershed enclosing the lake."),
+    'HUC12_TN': ("**🔍 HUC12_TN_mg/L**", "huc12_tn", "Adjust total nitrogen."),
+    'HUC10_TP': ("**📊 HUC10_TP_mg/L**", "huc10_tp", "Adjust total phosphorus."),
+}
@@ -0,0 +1,107 @@
+"""Vectorized bloom-magnitude scoring across lakes.
+
+Each lake script computes::
+
+    Y = intercept + sum(coef * (x - lo) / (hi - lo))
+    final_bloom_magnitude = Y * 194.0458755
+
+which is affine in the raw slider values. Folding the normalization bounds and
+the denormalizer into one weight matrix turns scoring N scenarios against L
+lakes into a single ``(N x F) @ (F x L)`` product.
+"""
+import numpy as np
+
+import registry
+
+
+def _union(schemas):
+    features = []
+    for schema in schemas:
+        features.extend(f for f in schema if f not in features)
+    return tuple(features)
+
+
+ALL_FEATURES = _union(registry.SCHEMAS.values())
+
+
+class Scorer:
+    """Precomputed weights for a set of lakes.
+
+    ``lakes`` is a schema name (``'landuse'`` or ``'nutrient'``), a sequence of
+    lake names or registry indices, or None for every lake. ``features`` names
+    the columns of the scenario arrays passed to :meth:`score`; by default it
+    is the lakes' shared schema, or the union of both schemas when the lakes
+    mix them. A feature a lake does not use gets a zero weight.
+    """
+
+    def __init__(self, reg=None, lakes=None, features=None):
+        reg = reg if reg is not None else registry.load()
+        if lakes is None or isinstance(lakes, str):
+            index = reg.lakes(lakes)
+        else:
+            index = np.array([reg.index(lake) if isinstance(lake, str) else int(lake) for lake in lakes],
+                             dtype=np.intp)
+        schemas = [registry.SCHEMAS[registry.SCHEMA_NAMES[s]] for s in np.unique(reg.schema[index])]
+        if features is None:
+            features = schemas[0] if len(schemas) == 1 else _union(schemas)
+        features = tuple(features)
+        column = {f: j for j, f in enumerate(features)}
+
+        weights = np.zeros((len(features), len(index)))
+        offset = np.empty(len(index))
+        baseline = np.zeros((len(index), len(features)))
+        for k, i in enumerate(index):
+            slope = reg.coef[i] / (reg.norm_hi[i] - reg.norm_lo[i])
+            for j, (f, w) in enumerate(zip(reg.features(str(reg.names[i])), slope)):
+                if f not in column:
+                    raise ValueError(f"lake {reg.names[i]!r} needs feature {f!r}")
+                weights[column[f], k] = w * reg.scale[i]
+                baseline[k, column[f]] = reg.baseline[i, j]
+            offset[k] = (reg.intercept[i] - slope @ reg.norm_lo[i]) * reg.scale[i]
+
+        self.registry = reg
+        self.index = index
+        self.names = reg.names[index]
+        self.features = features
+        self.weights = weights
+        self.offset = offset
+        # 2022 baseline in feature-column order (0 where a lake has no such feature)
+        self.baseline = baseline
+        self.norm_cyan = reg.norm_cyan[index]
+        self._position = {str(name): k for k, name in enumerate(self.names)}
+
+    def positions(self, names):
+        """Column positions of ``names`` in this scorer, -1 for unknown lakes."""
+        return np.array([self._position.get(str(n), -1) for n in names], dtype=np.intp)
+
+    def score(self, scenarios, out=None):
+        """Bloom magnitude for every scenario and lake, shape ``(N, L)``.
+
+        ``scenarios`` is ``(N, F)`` with columns in ``self.features`` order; a
+        single ``(F,)`` scenario returns an ``(L,)`` row.
+        """
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        if scenarios.shape[-1] != len(self.features):
+            raise ValueError(f"expected {len(self.features)} feature columns, "
+                             f"got {scenarios.shape[-1]}")
+        result = np.matmul(scenarios, self.weights, out=out)
+        result += self.offset
+        return result
+
+    def score_rows(self, lakes, scenarios):
+        """Bloom magnitude of scenario ``n`` for lake ``lakes[n]``, shape ``(N,)``.
+
+        ``lakes`` holds column positions (see :meth:`positions`); rows with a
+        negative position score as NaN.
+        """
+        lakes = np.asarray(lakes, dtype=np.intp)
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        known = lakes >= 0
+        take = np.where(known, lakes, 0)
+        result = np.einsum('nf,fn->n', scenarios, self.weights[:, take]) + self.offset[take]
+        result[~known] = np.nan
+        return result
+
+    def percentage_change(self, magnitude):
+        """Change relative to each lake's 2022 ``Norm_CyAN`` baseline, in %."""
+        return (magnitude - self.norm_cyan) / self.norm_cyan * 100
@@ -0,0 +1,112 @@
+// Browser-side lake estimator.
+//
+// Evaluates the same model as the lake scripts:
+//   Y = intercept + sum(coef * (x - lo) / (hi - lo))
+//   final_bloom_magnitude = Y * scale
+// so moving a slider never has to reach the Python server. A lake is the
+// JSON object built by client.lake_payload().
+(function (global) {
+  "use strict";
+
+  var THRESHOLD = 0.001;
+
+  function predict(lake, values) {
+    var Y = lake.intercept;
+    lake.features.forEach(function (f, j) {
+      Y += f.coef * (values[j] - f.normLo) / (f.normHi - f.normLo);
+    });
+    var magnitude = Y * lake.scale;
+    return {
+      magnitude: magnitude,
+      percentageChange: (magnitude - lake.normCyan) / lake.normCyan * 100
+    };
+  }
+
+  function el(tag, attrs, text) {
+    var node = document.createElement(tag);
+    Object.keys(attrs || {}).forEach(function (k) { node.setAttribute(k, attrs[k]); });
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function svg(tag, attrs) {
+    var node = document.createElementNS("http://www.w3.org/2000/svg", tag);
+    Object.keys(attrs).forEach(function (k) { node.setAttribute(k, attrs[k]); });
+    return node;
+  }
+
+  function drawChart(root, initial, predicted) {
+    var width = 480, height = 260, pad = 40;
+    var top = Math.max(initial, predicted, 0), bottom = Math.min(initial, predicted, 0);
+    var span = (top - bottom) || 1;
+    var y = function (v) { return pad / 2 + (top - v) / span * (height - pad); };
+    root.textContent = "";
+    var chart = svg("svg", {viewBox: "0 0 " + width + " " + height, width: "100%"});
+    chart.appendChild(svg("line", {x1: pad, x2: width, y1: y(0), y2: y(0), stroke: "#888"}));
+    [["Initial Bloom Magnitude", initial], ["Predicted Bloom Magnitude", predicted]].forEach(function (bar, k) {
+      var x = pad + 30 + k * (width - pad) / 2, w = (width - pad) / 2 - 60;
+      chart.appendChild(svg("rect", {
+        x: x, width: w, y: Math.min(y(bar[1]), y(0)),
+        height: Math.abs(y(bar[1]) - y(0)), fill: "#1f77b4"
+      }));
+      var label = svg("text", {x: x + w / 2, y: height - 4, "text-anchor": "middle", "font-size": 12});
+      label.textContent = bar[0];
+      chart.appendChild(label);
+    });
+    root.appendChild(chart);
+  }
+
+  function mount(root, lake) {
+    root.appendChild(el("h1", {style: "color: blue; text-align: center;"},
+      "Future Cyanobacteria Bloom Magnitude Estimation in " + lake.title));
+    var inputs = el("div", {"class": "cyan-inputs"});
+    inputs.appendChild(el("h2", {}, "🛠️ User Inputs:"));
+    inputs.appendChild(el("p", {}, "The default values represent mean annual measurements derived from the 2022 baseline for " + lake.title + "."));
+    root.appendChild(inputs);
+
+    var output = el("div", {"class": "cyan-output"});
+    output.appendChild(el("h2", {}, "📈 Model Output"));
+    output.appendChild(el("p", {}, "Initial Cyanobacteria Bloom Magnitude with the Baseline of 2022: " + lake.normCyan.toFixed(4)));
+    var predicted = output.appendChild(el("p"));
+    var change = output.appendChild(el("p"));
+    var message = output.appendChild(el("div"));
+    var chart = output.appendChild(el("div"));
+    root.appendChild(output);
+
+    var values = lake.features.map(function (f) { return f.value; });
+    function update() {
+      var result = predict(lake, values);
+      predicted.textContent = "Predicted Cyanobacteria Bloom Magnitude: " + result.magnitude.toFixed(4);
+      change.textContent = "Percentage Change: " + result.percentageChange.toFixed(2) + "%";
+      if (Math.abs(result.percentageChange) < THRESHOLD) {
+        message.className = "cyan-message info";
+        message.textContent = "The estimated bloom magnitude remains the same.";
+      } else if (result.percentageChange > 0) {
+        message.className = "cyan-message error";
+        message.textContent = "The annual magnitude of cyanobacteria bloom is predicted to increase.";
+      } else {
+        message.className = "cyan-message success";
+        message.textContent = "The annual magnitude of cyanobacteria bloom is predicted to decrease.";
+      }
+      drawChart(chart, lake.normCyan, result.magnitude);
+    }
+
+    lake.features.forEach(function (f, j) {
+      var row = inputs.appendChild(el("label", {title: f.help}));
+      row.appendChild(el("span", {}, f.label));
+      var shown = el("output", {}, f.value.toFixed(2));
+      var slider = el("input", {type: "range", min: f.lo, max: f.hi, step: 0.1});
+      slider.value = f.value;
+      slider.addEventListener("input", function () {
+        values[j] = parseFloat(slider.value);
+        shown.textContent = values[j].toFixed(2);
+        update();
+      });
+      row.appendChild(slider);
+      row.appendChild(shown);
+    });
+    update();
+  }
+
+  global.CyAN = {predict: predict, mount: mount};
+})(this);
@@ -0,0 +1,263 @@
+"""Scenario sweeps over the slider ranges of every lake.
+
+Generates a design over the six slider ranges (``b3..g4``) — a full-factorial
+grid, a Latin hypercube or a Sobol sequence — and scores it against all lakes
+of a schema in fixed-size chunks. Nothing proportional to the design size is
+kept in memory: each lake's statistics (count, min/max with the scenario that
+reaches them, mean, standard deviation, share of scenarios above the 2022
+baseline and histogram-based quantiles) are updated chunk by chunk and the
+summary CSV is rewritten every ``--flush-every`` chunks. Usage::
+
+    python sweep.py grid --levels 11 --output sweep.csv
+    python sweep.py lhs --samples 10000000 --seed 1 --schema landuse
+    python sweep.py sobol --samples 1048576        # needs scipy
+
+Because each lake model is affine, the exact magnitude range over the slider
+box is known up front, so the quantile histogram covers it exactly.
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+
+import numpy as np
+
+import registry
+import scoring
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def slider_box(scorer):
+    """Lower and upper slider bounds per feature, over the scorer's lakes."""
+    reg = scorer.registry
+    return reg.slider_lo[scorer.index].min(axis=0), reg.slider_hi[scorer.index].max(axis=0)
+
+
+def magnitude_bounds(scorer, lo, hi):
+    """Exact per-lake min and max magnitude over the box ``[lo, hi]``."""
+    low = scorer.weights * lo[:, None]
+    high = scorer.weights * hi[:, None]
+    return (scorer.offset + np.minimum(low, high).sum(axis=0),
+            scorer.offset + np.maximum(low, high).sum(axis=0))
+
+
+def grid_size(levels):
+    return math.prod(int(n) for n in levels)
+
+
+def grid_chunks(lo, hi, levels, chunk):
+    """Full-factorial grid with ``levels[j]`` evenly spaced points per feature."""
+    levels = np.asarray(levels, dtype=np.int64)
+    axes = [np.linspace(a, b, n) if n > 1 else np.array([a]) for a, b, n in zip(lo, hi, levels)]
+    total = grid_size(levels)
+    for start in range(0, total, chunk):
+        index = np.arange(start, min(start + chunk, total), dtype=np.int64)
+        digits = np.unravel_index(index, tuple(levels))
+        yield np.column_stack([axis[d] for axis, d in zip(axes, digits)])
+
+
+def _mix(z):
+    """splitmix64 finalizer: a well-mixed 64-bit hash of each element."""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class _Permutation:
+    """Keyed pseudo-random bijection of ``range(n)``, evaluated on demand.
+
+    A balanced Feistel network permutes the smallest ``4 ** k >= n`` domain;
+    indices landing at or past ``n`` are walked through it again until they
+    fall inside (cycle walking), which keeps the map a bijection of ``range(n)``.
+    """
+
+    ROUNDS = 6
+
+    def __init__(self, n, rng):
+        self.n = n
+        self.half = np.uint64(max(1, -(-(n - 1).bit_length() // 2)))
+        self.mask = np.uint64((1 << int(self.half)) - 1)
+        self.keys = rng.integers(0, np.iinfo(np.int64).max, size=self.ROUNDS).astype(np.uint64)
+
+    def _feistel(self, x):
+        left, right = x >> self.half, x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.mask)
+        return (left << self.half) | right
+
+    def __call__(self, index):
+        x = self._feistel(np.asarray(index, dtype=np.uint64))
+        outside = np.flatnonzero(x >= self.n)
+        while len(outside):
+            x[outside] = self._feistel(x[outside])
+            outside = outside[x[outside] >= self.n]
+        return x.astype(np.int64)
+
+
+def lhs_chunks(lo, hi, samples, chunk, rng):
+    """Latin hypercube of ``samples`` points, generated chunk by chunk.
+
+    Each feature's strata are visited through its own keyed pseudo-random
+    permutation (:class:`_Permutation`) instead of a stored shuffle, so every
+    stratum is hit exactly once, the features' orders are independent, and no
+    ``samples``-long index array is ever held in memory.
+    """
+    lo, hi = np.asarray(lo), np.asarray(hi)
+    perms = [_Permutation(samples, rng) for _ in lo]
+    for start in range(0, samples, chunk):
+        index = np.arange(start, min(start + chunk, samples), dtype=np.int64)
+        strata = np.column_stack([perm(index) for perm in perms])
+        unit = (strata + rng.random(strata.shape)) / samples
+        yield lo + unit * (hi - lo)
+
+
+def sobol_chunks(lo, hi, samples, chunk, seed):
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise SystemExit("Sobol designs need scipy: pip install scipy") from None
+    lo, hi = np.asarray(lo), np.asarray(hi)
+    engine = qmc.Sobol(len(lo), scramble=True, seed=seed)
+    for start in range(0, samples, chunk):
+        yield lo + engine.random(min(chunk, samples - start)) * (hi - lo)
+
+
+class StreamingStats:
+    """Per-lake running statistics of an (N x lakes) magnitude stream."""
+
+    def __init__(self, low, high, norm_cyan, features, bins=2048):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.width = np.where(self.high > self.low, self.high - self.low, 1.0)
+        self.norm_cyan = norm_cyan
+        self.bins = bins
+        lakes = len(self.low)
+        self.count = 0
+        self.mean = np.zeros(lakes)
+        self.m2 = np.zeros(lakes)
+        self.above = np.zeros(lakes, dtype=np.int64)
+        self.min = np.full(lakes, np.inf)
+        self.max = np.full(lakes, -np.inf)
+        self.argmin = np.full((lakes, features), np.nan)
+        self.argmax = np.full((lakes, features), np.nan)
+        self.histogram = np.zeros((lakes, bins), dtype=np.int64)
+
+    def update(self, scenarios, values):
+        n, lakes = values.shape
+        if n == 0:
+            return
+        # Chan et al. parallel update of mean and sum of squared deviations
+        chunk_mean = values.mean(axis=0)
+        chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.above += (values > self.norm_cyan).sum(axis=0)
+
+        rows = np.arange(lakes)
+        lo_at, hi_at = values.argmin(axis=0), values.argmax(axis=0)
+        lower = values[lo_at, rows] < self.min
+        higher = values[hi_at, rows] > self.max
+        self.min[lower] = values[lo_at, rows][lower]
+        self.max[higher] = values[hi_at, rows][higher]
+        self.argmin[lower] = scenarios[lo_at[lower]]
+        self.argmax[higher] = scenarios[hi_at[higher]]
+
+        bin_index = ((values - self.low) / self.width * self.bins).astype(np.int64)
+        np.clip(bin_index, 0, self.bins - 1, out=bin_index)
+        flat = (bin_index + rows * self.bins).ravel()
+        self.histogram += np.bincount(flat, minlength=lakes * self.bins).reshape(lakes, self.bins)
+
+    def quantiles(self, qs=QUANTILES):
+        """Quantiles read off the histogram, shape (len(qs), lakes)."""
+        cumulative = np.cumsum(self.histogram, axis=1)
+        edges_per_bin = self.width / self.bins
+        result = np.empty((len(qs), len(self.low)))
+        for k, q in enumerate(qs):
+            target = q * self.count
+            b = np.minimum((cumulative < target).sum(axis=1), self.bins - 1)
+            before = np.where(b > 0, cumulative[np.arange(len(b)), b - 1], 0)
+            inside = self.histogram[np.arange(len(b)), b]
+            fraction = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0.5)
+            result[k] = self.low + (b + fraction) * edges_per_bin
+        return result
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+
+def write_summary(path, names, features, stats):
+    """Rewrite the summary CSV atomically (temp file + rename)."""
+    quantiles = stats.quantiles()
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['lake', 'scenarios', 'min', 'max', 'mean', 'std', 'share_above_baseline',
+                         *[f"q{round(q * 100):02d}" for q in QUANTILES],
+                         *[f"min_at_{feature}" for feature in features],
+                         *[f"max_at_{feature}" for feature in features]])
+        for i, name in enumerate(names):
+            writer.writerow([name, stats.count, stats.min[i], stats.max[i], stats.mean[i], stats.std[i],
+                             stats.above[i] / max(stats.count, 1), *quantiles[:, i],
+                             *stats.argmin[i], *stats.argmax[i]])
+    os.replace(tmp, path)
+
+
+def sweep(scorer, chunks, stats, flush=None, flush_every=10):
+    """Score every chunk and fold it into ``stats``; ``flush()`` runs periodically."""
+    out = None
+    for n, scenarios in enumerate(chunks, 1):
+        if out is None or out.shape[0] != len(scenarios):
+            out = np.empty((len(scenarios), len(scorer.names)))
+        stats.update(scenarios, scorer.score(scenarios, out=out))
+        if flush and n % flush_every == 0:
+            flush()
+    if flush:
+        flush()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the slider space of every lake")
+    parser.add_argument('design', choices=('grid', 'lhs', 'sobol'))
+    parser.add_argument('--schema', choices=registry.SCHEMA_NAMES, default='landuse')
+    parser.add_argument('--levels', type=int, help="grid points per feature")
+    parser.add_argument('--step', type=float, help="grid spacing in slider units (0.1 = slider resolution)")
+    parser.add_argument('--samples', type=int, default=1_000_000, help="points for lhs/sobol")
+    parser.add_argument('--chunk', type=int, default=16_384, help="scenarios scored per chunk")
+    parser.add_argument('--bins', type=int, default=2048, help="histogram bins per lake for quantiles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--flush-every', type=int, default=50, help="chunks between summary rewrites")
+    parser.add_argument('--output', default='sweep.csv')
+    parser.add_argument('--registry', default=registry.DEFAULT_PATH, help="compiled lakes.npz")
+    args = parser.parse_args(argv)
+
+    scorer = scoring.Scorer(registry.load(args.registry), args.schema)
+    lo, hi = slider_box(scorer)
+    if args.design == 'grid':
+        if args.step:
+            levels = np.floor((hi - lo) / args.step + 1e-9).astype(np.int64) + 1
+        else:
+            levels = np.full(len(lo), args.levels or 11)
+        print(f"grid of {grid_size(levels):,} scenarios", file=sys.stderr)
+        chunks = grid_chunks(lo, hi, levels, args.chunk)
+    elif args.design == 'lhs':
+        chunks = lhs_chunks(lo, hi, args.samples, args.chunk, np.random.default_rng(args.seed))
+    else:
+        chunks = sobol_chunks(lo, hi, args.samples, args.chunk, args.seed)
+
+    low, high = magnitude_bounds(scorer, lo, hi)
+    stats = StreamingStats(low, high, scorer.norm_cyan, len(scorer.features), args.bins)
+    sweep(scorer, chunks, stats,
+          flush=lambda: write_summary(args.output, scorer.names, scorer.features, stats),
+          flush_every=args.flush_every)
+    print(f"swept {stats.count:,} scenarios over {len(scorer.names)} lakes into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live next to the lake scripts and import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import registry  # noqa: E402
+
+
+@pytest.fixture
+def reg():
+    return registry.load()
+
+
+@pytest.fixture
+def observations(reg):
+    """Noisy lake-years 1990-2022 for every lake from known coefficients.
+
+    Returns ``(table, beta)``; ``beta`` is ``(lakes, 7)`` over the registry's
+    normalization bounds, with ``Norm_CyAN`` in magnitude units.
+    """
+    rng = np.random.default_rng(11)
+    beta = rng.normal(size=(len(reg), 7))
+    rows = []
+    for i, name in enumerate(map(str, reg.names)):
+        x = reg.slider_lo[i] + rng.random((33, 6)) * (reg.slider_hi[i] - reg.slider_lo[i])
+        normalized = (x - reg.norm_lo[i]) / (reg.norm_hi[i] - reg.norm_lo[i])
+        y = (beta[i, 0] + normalized @ beta[i, 1:] + rng.normal(scale=0.05, size=33)) * reg.scale[i]
+        for year, inputs, target in zip(range(1990, 2023), x, y):
+            rows.append({'lake': name, 'year': year, 'Norm_CyAN': target, **dict(zip(reg.features(name), inputs))})
+    return pd.DataFrame(rows), beta
@@ -0,0 +1,48 @@
+import numpy as np
+
+import bootstrap
+import fit
+import uncertainty
+
+
+def test_covariance_matches_least_squares_theory(reg, observations):
+    table, _ = observations
+    boot, names = bootstrap.run(reg, table, replicates=400, jobs=1)
+
+    assert len(names) == len(reg)
+    assert np.allclose(boot.coef, fit.refit(reg, table)[0].coef)
+    analytic = boot.residual_var[:, None, None] * np.linalg.inv(boot.gram)
+    ratio = np.diagonal(boot.coef_cov, axis1=1, axis2=2) / np.diagonal(analytic, axis1=1, axis2=2)
+    assert 0.8 < np.median(ratio) < 1.25
+
+
+def test_seed_not_workers_decides(reg, observations):
+    table, _ = observations
+    serial, _ = bootstrap.run(reg, table, replicates=48, jobs=1)
+    pooled, _ = bootstrap.run(reg, table, replicates=48, jobs=2)
+    other, _ = bootstrap.run(reg, table, replicates=48, jobs=1, seed=1)
+
+    assert np.array_equal(serial.coef_cov, pooled.coef_cov)
+    assert not np.array_equal(serial.coef_cov, other.coef_cov)
+
+
+def test_interval_covers_the_prediction(reg, observations):
+    table, _ = observations
+    boot, _ = bootstrap.run(reg, table, replicates=64, jobs=1)
+    i = reg.index('Yale')
+    low, high = bootstrap.interval(boot, 'Yale', reg.baseline[i])
+    center = (boot.intercept[i] + (reg.baseline[i] - reg.norm_lo[i]) / (reg.norm_hi[i] - reg.norm_lo[i])
+              @ boot.coef[i]) * reg.scale[i]
+
+    assert low < center < high
+    assert bootstrap.interval(reg, 'Yale', reg.baseline[i]) is None
+
+
+def test_simulate_accepts_a_singular_covariance(reg):
+    i = reg.index('Yale')
+    direction = np.arange(1.0, 8.0)
+    singular = np.outer(direction, direction) * 1e-4   # rank one
+    result = uncertainty.simulate(reg, 'Yale', reg.baseline[i], coef_cov=singular, samples=2000, seed=0)
+
+    assert np.isfinite(result.samples).all()
+    assert result.interval[0] < result.interval[1]
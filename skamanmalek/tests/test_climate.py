@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import climate
+
+OPTIONS = {'tmax': 'tmax', 'precip': 'precip', 'units': 'F', 'precip_scale': 1.0, 'chunk': 10}
+
+
+def brute_zone_means(labels, block, zones):
+    means = np.full((len(block), zones + 1), np.nan)
+    for day in range(len(block)):
+        for zone in range(1, zones + 1):
+            values = block[day][(labels == zone) & np.isfinite(block[day])]
+            if len(values):
+                means[day, zone] = values.mean()
+    return means
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(5)
+    labels = rng.integers(0, 7, size=(9, 11))   # labels 5 and 6 are past the zones
+    block = rng.normal(size=(6, 9, 11))
+    block[rng.random(block.shape) < 0.2] = np.nan
+    return labels, block
+
+
+def test_daily_zone_means_match_brute_force(grid):
+    labels, block = grid
+    means = climate.daily_zone_means(labels, block, 4)
+    assert means.shape == (6, 5)
+    np.testing.assert_allclose(means, brute_zone_means(labels, block, 4))
+
+
+def write_year(folder, year, rng):
+    days = np.arange(f'{year}-01-01', f'{year + 1}-01-01', dtype='datetime64[D]')
+    path = folder / str(year)
+    path.mkdir()
+    np.save(path / 'time.npy', days)
+    np.save(path / 'tmax.npy', rng.normal(80, 10, size=(len(days), 4, 5)))
+    np.save(path / 'precip.npy', rng.gamma(1.0, 2.0, size=(len(days), 4, 5)))
+    return str(path)
+
+
+def test_reduce_years_and_cache(tmp_path):
+    rng = np.random.default_rng(9)
+    labels = rng.integers(0, 4, size=(4, 5))
+    np.save(tmp_path / 'labels.npy', labels)
+    inputs = {year: write_year(tmp_path, year, rng) for year in (2020, 2021)}
+    cache = climate.YearCache(str(tmp_path / 'cache'))
+    labels_path = str(tmp_path / 'labels.npy')
+
+    results, read = climate.reduce_years(inputs, labels_path, 3, OPTIONS, cache, jobs=1)
+    assert read == [2020, 2021]
+    tmax = np.load(inputs[2021] + '/tmax.npy')
+    expected = [max(tmax[d][labels == zone].mean() for d in range(len(tmax))) for zone in (1, 2, 3)]
+    np.testing.assert_allclose(results[2021]['tmax'][1:], expected)
+    precip = np.load(inputs[2021] + '/precip.npy')
+    daily = np.array([[precip[d][labels == zone].mean() for zone in (1, 2, 3)] for d in range(len(precip))])
+    np.testing.assert_allclose(climate.rain_statistic(results[2021], 'annual')[1:], daily.sum(axis=0))
+
+    # A different read chunk reuses the cache; a different zone count does not
+    again, read = climate.reduce_years(inputs, labels_path, 3, dict(OPTIONS, chunk=64), cache, jobs=1)
+    assert read == []
+    np.testing.assert_allclose(again[2021]['tmax'], results[2021]['tmax'])
+    wider, read = climate.reduce_years(inputs, labels_path, 5, OPTIONS, cache, jobs=1)
+    assert read == [2020, 2021] and wider[2020]['tmax'].shape == (6,)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+import events
+import history
+
+
+def scalar_events(values, on, off, min_duration=1):
+    """Day-by-day reference: ``(lake, onset, end, peak)`` tuples and the open blooms."""
+    found, open_blooms = [], {}
+    for lake, row in enumerate(values):
+        state, onset, peak = False, -1, -np.inf
+        for day, value in enumerate(row):
+            if value >= on[lake]:
+                now = True
+            elif value < off[lake]:
+                now = False
+            else:
+                now = state   # between the thresholds or missing
+            if now and not state:
+                onset, peak = day, -np.inf
+            if not now and state and day - onset >= min_duration:
+                found.append((lake, onset, day, peak))
+            if now and not np.isnan(value):
+                peak = max(peak, value)
+            state = now
+        if state:
+            open_blooms[lake] = (onset, peak)
+    return sorted(found), open_blooms
+
+
+def detected(detector):
+    return sorted(zip(detector.event_lake.tolist(), detector.event_onset.tolist(),
+                      detector.event_end.tolist(), detector.event_peak.tolist()))
+
+
+@pytest.fixture
+def record():
+    rng = np.random.default_rng(7)
+    values = np.cumsum(rng.normal(size=(12, 1500)), axis=1)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    on = np.nanquantile(values, 0.8, axis=1)
+    off = np.nanquantile(values, 0.6, axis=1)
+    return values, on, off
+
+
+@pytest.mark.parametrize('chunk', [None, 137, 1])
+@pytest.mark.parametrize('min_duration', [1, 5])
+def test_matches_scalar_reference(record, chunk, min_duration):
+    values, on, off = record
+    expected, open_blooms = scalar_events(values, on, off, min_duration)
+    detector = events.Detector(on, off, min_duration)
+    for start in range(0, values.shape[1], chunk or values.shape[1]):
+        detector.step(values[:, start:start + (chunk or values.shape[1])])
+
+    assert detector.through == values.shape[1]
+    assert detected(detector) == pytest.approx(expected)
+    for lake in range(len(values)):
+        assert detector.state[lake] == (lake in open_blooms)
+        if lake in open_blooms:
+            assert detector.onset[lake] == open_blooms[lake][0]
+            assert detector.peak[lake] == pytest.approx(open_blooms[lake][1])
+
+
+def test_save_and_load_resume(record, tmp_path):
+    values, on, off = record
+    detector = events.Detector(on, off)
+    detector.step(values[:, :700])
+    detector.save(str(tmp_path / 'events.npz'))
+    resumed = events.Detector.load(str(tmp_path / 'events.npz'))
+    resumed.step(values[:, 700:])
+
+    assert detected(resumed) == pytest.approx(scalar_events(values, on, off)[0])
+
+
+def test_default_thresholds_end_blooms_on_zero_heavy_series(tmp_path):
+    rng = np.random.default_rng(3)
+    values = np.where(rng.random((4, 2000)) < 0.1, rng.gamma(2.0, 50.0, (4, 2000)), 0.0)
+    values[3] = np.where(values[3] > 0, 100.0, 0.0)   # one nonzero level: the quantiles tie
+    store = history.Store.create(str(tmp_path), ['a', 'b', 'c', 'd'], '2020-01-01')
+    store.write('2020-01-01', values)
+
+    on, off = events.default_thresholds(store)
+    assert (off > 0).all() and (on > off).all()
+    detector = events.update(store)
+    assert len(detector.event_lake) > 0
+    stored = values.astype(np.float32).astype(np.float64)   # the store keeps float32
+    assert detected(detector) == pytest.approx(scalar_events(stored, on, off)[0])
+    # A zero ends any bloom, so none runs past the last zero
+    assert not detector.state[values[:, -1] == 0].any()
+
+
+def test_update_detects_rewritten_days_again(record, tmp_path):
+    values, on, off = record
+    lakes = [str(i) for i in range(len(values))]
+    store = history.Store.create(str(tmp_path), lakes, '2020-01-01')
+    store.write('2020-01-01', values[:, :1000])
+    events.update(store, on, off)
+
+    # A correction before ``through`` and new days after it
+    corrected = values.copy()
+    corrected[:, 200:260] = np.nanmax(values) + 1
+    store.write('2020-01-01', corrected[:, :1000])
+    store.write(store.start + 1000, corrected[:, 1000:])
+    detector = events.update(store)
+
+    assert detector.through == values.shape[1]
+    stored = corrected.astype(np.float32).astype(np.float64)   # the store keeps float32
+    assert detected(detector) == pytest.approx(scalar_events(stored, on, off)[0])
+    assert store.changed_since(detector.revision) is None
@@ -0,0 +1,43 @@
+import numpy as np
+
+import fit
+import model
+
+
+def test_refit_matches_per_lake_least_squares(reg, observations):
+    table, _ = observations
+    refitted, names = fit.refit(reg, table)
+
+    assert len(names) == len(reg)
+    assert (refitted.nobs == 33).all()
+    index, X, y, _, _ = fit.design(reg, table)
+    for i in (0, reg.index('Yale'), reg.index('lakeLoughman')):
+        expected = np.linalg.lstsq(X[index == i], y[index == i], rcond=None)[0]
+        assert np.allclose(refitted.intercept[i], expected[0])
+        assert np.allclose(refitted.coef[i], expected[1:])
+
+
+def test_refit_ignores_row_order(reg, observations):
+    table, _ = observations
+    first, _ = fit.refit(reg, table)
+    second, _ = fit.refit(reg, table.sample(frac=1, random_state=0))
+
+    assert np.array_equal(first.coef, second.coef)
+
+
+def test_renormalize_keeps_bounds_of_constant_inputs(reg, observations, tmp_path):
+    table, _ = observations
+    lake = 'Yale'
+    feature = reg.features(lake)[2]
+    table.loc[table.lake == lake, feature] = 42.0
+    refitted, _ = fit.refit(reg, table, renormalize=True)
+
+    i, j = reg.index(lake), reg.features(lake).index(feature)
+    assert (refitted.norm_hi > refitted.norm_lo).all()
+    assert refitted.norm_lo[i, j] == reg.norm_lo[i, j] and refitted.norm_hi[i, j] == reg.norm_hi[i, j]
+    refitted.save(str(tmp_path / 'lakes.npz'))
+    model.load(str(tmp_path / 'lakes.npz'))
+    try:
+        assert np.isfinite(model.predict(lake))
+    finally:
+        model.load()
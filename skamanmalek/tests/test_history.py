@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import history
+
+
+def day(value):
+    return np.datetime64(value, 'D')
+
+
+def test_write_append_and_grow(tmp_path):
+    store = history.Store.create(str(tmp_path), ['a', 'b'], '2020-01-01', capacity=4)
+    store.write('2020-01-01', [[1, 2, 3], [4, 5, 6]])
+    for k in range(5):
+        store.append(day('2020-01-04') + k, [10 + k, np.nan])
+
+    assert store.days == 8 and store.capacity >= 8
+    days, values = store.series('a', '2020-01-02', '2020-01-06')
+    assert days.tolist() == (day('2020-01-02') + np.arange(4)).tolist()
+    assert values.tolist() == [2, 3, 10, 11]
+    assert np.isnan(store.series('b')[1][3:]).all()
+
+    reader = history.load(str(tmp_path))
+    assert reader.series('a')[1].tolist() == [1, 2, 3, 10, 11, 12, 13, 14]
+    with pytest.raises(ValueError):
+        reader.write('2020-01-01', [[0], [0]])
+
+
+def test_write_before_the_first_day_moves_start_back(tmp_path):
+    store = history.Store.create(str(tmp_path), ['a', 'b'], '2020-01-10', capacity=8)
+    store.write('2020-01-10', [[1, 2], [3, 4]])
+    store.write('2020-01-07', [[7]], lakes=['b'])
+
+    assert store.start == day('2020-01-07') and store.days == 5
+    assert store.end == day('2020-01-12')
+    np.testing.assert_array_equal(store.series('a')[1], [np.nan, np.nan, np.nan, 1, 2])
+    np.testing.assert_array_equal(store.series('b')[1], [7, np.nan, np.nan, 3, 4])
+    assert store.changed_since(store.revision - 1) == 0   # every column moved
+    assert history.load(str(tmp_path)).series('b', '2020-01-10')[1].tolist() == [3, 4]
+
+
+def test_import_csv_keeps_existing_days_and_backfills(tmp_path):
+    store_path = str(tmp_path / 'store')
+    first = tmp_path / 'first.csv'
+    first.write_text("lake,date,value\na,2021-03-01,1\na,2021-03-03,3\nb,2021-03-02,5\nc,2021-03-02,9\n")
+    store, unknown = history.import_csv(str(first), store_path, ['a', 'b'])
+    assert unknown == ['c'] and store.start == day('2021-03-01')
+
+    later = tmp_path / 'later.csv'
+    later.write_text("lake,date,value\na,2021-02-27,0.5\na,2021-03-02,2\nb,2021-03-05,\n")
+    store, unknown = history.import_csv(str(later), store_path, ['a', 'b'])
+
+    assert unknown == [] and store.start == day('2021-02-27')
+    np.testing.assert_array_equal(store.series('a')[1], [0.5, np.nan, 1, 2, 3])
+    np.testing.assert_array_equal(store.series('b')[1], [np.nan, np.nan, np.nan, 5, np.nan])
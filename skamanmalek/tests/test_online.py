@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import fit
+import online
+
+
+def test_update_matches_full_refit(reg, observations):
+    table, _ = observations
+    old, new = table[table.year < 2015], table[table.year >= 2015]
+    updated, used = online.update(fit.refit(reg, old)[0], new)
+    full, _ = fit.refit(reg, table)
+
+    assert used == len(new)
+    assert np.abs(updated.coef - full.coef).max() < 1e-9
+    assert np.abs(updated.intercept - full.intercept).max() < 1e-9
+    assert np.allclose(updated.gram, full.gram) and (updated.nobs == full.nobs).all()
+
+
+def test_refit_after_update_resets_the_inverse(reg, observations):
+    """A batch refit must not leave the previous fit's inverse Gram matrix behind."""
+    table, _ = observations
+    early, middle, late = table[table.year < 2005], table[table.year < 2015], table[table.year >= 2015]
+    stale, _ = online.update(fit.refit(reg, early)[0], table[(table.year >= 2005) & (table.year < 2010)])
+    updated, _ = online.update(fit.refit(stale, middle)[0], late)
+    full, _ = fit.refit(reg, table)
+
+    assert np.abs(updated.coef - full.coef).max() < 1e-9
+
+
+def test_stats_refit_and_forgetting(reg, observations):
+    table, _ = observations
+    updated, _ = online.update(fit.refit(reg, table[table.year < 2015])[0], table[table.year >= 2015])
+    exact = online.refit(updated)
+    assert np.allclose(exact.coef, fit.refit(reg, table)[0].coef)
+
+    discounted, _ = online.update(fit.refit(reg, table[table.year < 2015])[0], table[table.year >= 2015],
+                                  forgetting=0.9)
+    i = reg.index('Yale')
+    assert discounted.nobs[i] == 33
+    assert discounted.yy[i] < updated.yy[i]
+    assert np.isfinite(discounted.inverse_gram).all()
+
+
+def test_first_update_without_statistics(reg, observations):
+    table, _ = observations
+    updated, _ = online.update(reg, table)
+    assert np.allclose(updated.coef, fit.refit(reg, table)[0].coef, atol=1e-3)
+    with pytest.raises(SystemExit):
+        online.refit(reg)
@@ -0,0 +1,64 @@
+"""Monte Carlo uncertainty for a lake's bloom prediction.
+
+Instead of the single point estimate of the lake page, draw many scenarios
+around the chosen slider values (and optionally around the coefficients),
+push them through the lake model in one vectorized call and summarize the
+spread as prediction intervals and exceedance probabilities. 100k draws take
+a few milliseconds, cheap enough for an interactive rerun.
+
+Input draws are normal with standard deviation ``input_sd`` (in slider units,
+one value per feature or a scalar) and are clipped to the slider range.
+Coefficient draws are normal with standard deviation ``coef_sd`` times the
+magnitude of each coefficient (a relative spread), or come from
+``coef_cov``, a full covariance over ``(intercept, *coef)``.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Result = namedtuple('Result', 'samples mean std interval exceedance')
+
+
+def simulate(reg, lake, values, input_sd=0.0, coef_sd=0.0, coef_cov=None,
+             samples=100_000, level=0.95, thresholds=None, seed=None):
+    """Simulate bloom magnitudes for ``lake`` around ``values``.
+
+    ``thresholds`` maps a label to a magnitude and defaults to the lake's
+    2022 baseline; each exceedance is ``P(magnitude > threshold)``.
+    Returns a :class:`Result`; ``samples`` holds the simulated magnitudes.
+    """
+    i = reg.index(lake)
+    rng = np.random.default_rng(seed)
+    lo, hi = reg.norm_lo[i], reg.norm_hi[i]
+
+    x = np.asarray(values, dtype=np.float64)
+    input_sd = np.broadcast_to(np.asarray(input_sd, dtype=np.float64), x.shape)
+    if np.any(input_sd > 0):
+        x = x + rng.standard_normal((samples, len(x))) * input_sd
+        np.clip(x, reg.slider_lo[i], reg.slider_hi[i], out=x)
+    else:
+        x = np.broadcast_to(x, (samples, len(x)))
+    normalized = (x - lo) / (hi - lo)
+
+    beta = np.concatenate(([reg.intercept[i]], reg.coef[i]))
+    if coef_cov is not None:
+        # eigh, unlike Cholesky, accepts the rank-deficient covariances a bootstrap can give
+        beta = rng.multivariate_normal(beta, coef_cov, size=samples, method='eigh')
+    elif np.any(np.asarray(coef_sd) > 0):
+        beta = beta + rng.standard_normal((samples, len(beta))) * np.abs(beta) * coef_sd
+    if beta.ndim == 1:
+        Y = beta[0] + normalized @ beta[1:]
+    else:
+        Y = beta[:, 0] + np.einsum('sf,sf->s', normalized, beta[:, 1:])
+    magnitude = Y * reg.scale[i]
+
+    if thresholds is None:
+        thresholds = {'baseline': float(reg.norm_cyan[i])}
+    tail = (1 - level) / 2
+    return Result(
+        samples=magnitude,
+        mean=float(magnitude.mean()),
+        std=float(magnitude.std()),
+        interval=tuple(np.quantile(magnitude, [tail, 1 - tail]).tolist()),
+        exceedance={label: float((magnitude > t).mean()) for label, t in thresholds.items()},
+    )
@@ -0,0 +1,109 @@
+"""Windowed raster reads and ``bincount`` zonal sums.
+
+Rasters are read a strip of rows at a time so memory stays bounded by the
+window, not the raster. GeoTIFFs go through rasterio (optional; windowed
+reads keep only one strip decoded) and ``.npy`` arrays through a read-only
+memory map, which also serves as the offline fixture format. Zones are an
+integer label raster on the same grid (0 = outside every zone); per-zone
+sums over a window are a single ``np.bincount``.
+"""
+import csv
+import os
+
+import numpy as np
+
+WINDOW_ROWS = 512
+
+
+def _import_rasterio():
+    try:
+        import rasterio
+    except ImportError:
+        raise SystemExit("GeoTIFF rasters need rasterio: pip install rasterio") from None
+    return rasterio
+
+
+def is_geotiff(path):
+    return os.path.splitext(path)[1].lower() in ('.tif', '.tiff')
+
+
+def raster_grid(path):
+    """``((height, width), transform)`` of a raster; the transform is None for ``.npy``."""
+    if is_geotiff(path):
+        with _import_rasterio().open(path) as src:
+            return (src.height, src.width), tuple(src.transform)
+    return tuple(np.load(path, mmap_mode='r').shape[:2]), None
+
+
+def read_windows(path, rows=WINDOW_ROWS, start=0, stop=None):
+    """Yield ``(row_slice, block)`` strips covering rows ``start:stop`` of band 1."""
+    if is_geotiff(path):
+        rasterio = _import_rasterio()
+        from rasterio.windows import Window
+        with rasterio.open(path) as src:
+            stop = src.height if stop is None else min(stop, src.height)
+            for top in range(start, stop, rows):
+                height = min(rows, stop - top)
+                yield slice(top, top + height), src.read(1, window=Window(0, top, src.width, height))
+    else:
+        data = np.load(path, mmap_mode='r')
+        stop = data.shape[0] if stop is None else min(stop, data.shape[0])
+        for top in range(start, stop, rows):
+            bottom = min(top + rows, stop)
+            yield slice(top, bottom), np.asarray(data[top:bottom])
+
+
+def read_labels(path, shape=None, polygons=None):
+    """Zone label raster: a ``.npy``/GeoTIFF label file, or GeoJSON rasterized.
+
+    With ``polygons`` (a GeoJSON path whose features carry a ``zone``
+    property) the polygons are burned onto the grid of the raster at ``path``.
+    The result is memory-mapped for ``.npy`` inputs.
+    """
+    if polygons:
+        rasterio = _import_rasterio()
+        import json
+        from rasterio import features
+        with open(polygons, encoding='utf-8') as f:
+            shapes = [(feature['geometry'], int(feature['properties']['zone']))
+                      for feature in json.load(f)['features']]
+        with rasterio.open(path) as src:
+            labels = features.rasterize(shapes, out_shape=(src.height, src.width),
+                                        transform=src.transform, fill=0, dtype='int32')
+    elif is_geotiff(path):
+        with _import_rasterio().open(path) as src:
+            labels = src.read(1)
+    else:
+        labels = np.load(path, mmap_mode='r')
+    if shape is not None and tuple(labels.shape) != tuple(shape):
+        raise ValueError(f"label raster is {labels.shape[0]}x{labels.shape[1]}, "
+                         f"expected {shape[0]}x{shape[1]}")
+    return labels
+
+
+def read_zones(path):
+    """``{label value: lake name}`` from a ``zone,lake`` CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {int(row['zone']): row['lake'].strip() for row in csv.DictReader(f)}
+
+
+def zone_sums(labels, values, zones, valid=None):
+    """Per-zone ``(count, total)`` of ``values`` where ``valid`` (and label > 0)."""
+    keep = labels > 0
+    if valid is not None:
+        keep &= valid
+    index = labels[keep].astype(np.intp)
+    count = np.bincount(index, minlength=zones + 1)[:zones + 1]
+    total = np.bincount(index, weights=values[keep], minlength=zones + 1)[:zones + 1]
+    return count, total
+
+
+def zone_classes(labels, classes, zones, n_classes):
+    """``(zones + 1, n_classes)`` pixel counts of every class in every zone.
+
+    ``classes`` holds class indices; negative ones (no data) are skipped.
+    """
+    keep = (labels > 0) & (classes >= 0)
+    flat = labels[keep].astype(np.intp) * n_classes + classes[keep].astype(np.intp)
+    return np.bincount(flat, minlength=(zones + 1) * n_classes)[:(zones + 1) * n_classes].reshape(
+        zones + 1, n_classes)